@@ -8,9 +8,14 @@ _appender.PropertyAppender = _PropertyAppender
 from suds_patch import _bodycontent
 from suds.bindings import document as _document
 _document.Document.bodycontent = _bodycontent
+
+from suds_patch import _process
+from suds.bindings import multiref as _multiref
+_multiref.MultiRef.process = _process
 # end runtime patching of suds
 
 from client import ETClient
+from async_client import AsyncETClient
 
 # Import all the wrapper objects
 from objects import *
@@ -0,0 +1,66 @@
+from .client import ETClient
+from .concurrency import ETThreadPool
+from .config import exact_target_config
+
+
+class AsyncETClient(ETClient):
+    '''
+    ETClient that runs SOAP and REST operations concurrently. get/post/patch/delete/get_more_results
+    take an ETGetSupport/ETCUDSupport/ETCUDSupportRest object, start the call on the client's worker
+    pool and return an ETFuture straight away, call result() on it for the usual response object.
+
+    At most max_concurrency calls are in flight at once (param 'max_concurrency' or
+    FUELSDK_MAX_CONCURRENCY), the HTTP connection pool is sized to match unless http_pool_maxsize is given.
+    Calls beyond that wait on the pool, and once max_pending of them are waiting (param 'max_pending',
+    twice max_concurrency by default) starting another call blocks until one gets a worker.
+    An object holds the cursor of its last call, so only have one call in flight per object.
+    '''
+
+    pool = None
+
+    def __init__(self, get_server_wsdl=False, debug=False, params=None):
+        params = dict(params or {})
+        if 'max_concurrency' in params:
+            max_concurrency = params['max_concurrency']
+        else:
+            max_concurrency = exact_target_config.max_concurrency
+        params.setdefault('http_pool_maxsize', max_concurrency)
+        max_pending = params.get('max_pending')
+
+        super(AsyncETClient, self).__init__(get_server_wsdl, debug, params)
+        self.pool = ETThreadPool(max_workers=max_concurrency, max_pending=max_pending, name='FuelSDK-async')
+
+    def submit(self, fn, *args, **kwargs):
+        '''
+        run any callable on the worker pool
+        '''
+        return self.pool.submit(fn, *args, **kwargs)
+
+    def get(self, obj, *args, **kwargs):
+        return self.submit(self._bound(obj).get, *args, **kwargs)
+
+    def post(self, obj, *args, **kwargs):
+        return self.submit(self._bound(obj).post, *args, **kwargs)
+
+    def patch(self, obj, *args, **kwargs):
+        return self.submit(self._bound(obj).patch, *args, **kwargs)
+
+    def delete(self, obj, *args, **kwargs):
+        return self.submit(self._bound(obj).delete, *args, **kwargs)
+
+    def get_more_results(self, obj):
+        return self.submit(self._bound(obj).get_more_results)
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def _bound(self, obj):
+        if obj.auth_stub is None:
+            obj.auth_stub = self
+        return obj
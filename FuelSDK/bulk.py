@@ -0,0 +1,491 @@
+import codecs
+import csv
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from itertools import chain, islice, izip
+
+from .concurrency import ETThreadPool, prefetch
+from .config import exact_target_config
+from .objects import ETDataExtensionColumn, ETDataExtensionRow, ETDataExtensionRowEncoder
+from .rest import ETDelete, ETPatch, ETPost
+from .utility import get_prop
+
+# Update with SaveAction UpdateAdd inserts rows whose primary key is new and updates the rest
+UPSERT_OPTIONS = {'SaveOptions': {'SaveOption': [{'PropertyName': '*', 'SaveAction': 'UpdateAdd'}]}}
+
+
+def chunks(iterable, size):
+    '''
+    yield (index of the first item, list of up to size items) without reading ahead of the current chunk
+    '''
+    iterator = iter(iterable)
+    start = 0
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def decode_text(value, encoding):
+    return value.decode(encoding) if isinstance(value, str) else value
+
+
+class ETRowHashIndex(object):
+    '''
+    sqlite file holding a content hash per primary key of the rows last written to each DataExtension,
+    plus which delta run last saw each key, for ETDataExtensionRowWriter.iter_delta_upsert
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS row_hashes ('
+                            'data_extension TEXT, row_key TEXT, hash TEXT, run INTEGER, PRIMARY KEY (data_extension, row_key))')
+            self.db.execute('CREATE TABLE IF NOT EXISTS runs (data_extension TEXT PRIMARY KEY, run INTEGER, complete INTEGER)')
+
+    def begin(self, data_extension):
+        run = self.last_run(data_extension)[0] + 1
+        with self.lock, self.db:
+            self.db.execute('INSERT OR REPLACE INTO runs (data_extension, run, complete) VALUES (?, ?, 0)', (data_extension, run))
+        return run
+
+    def finish(self, data_extension, run):
+        with self.lock, self.db:
+            self.db.execute('UPDATE runs SET complete = 1 WHERE data_extension = ? AND run = ?', (data_extension, run))
+
+    def last_run(self, data_extension):
+        '''
+        (number of the last delta run, whether it ran to completion), (0, False) before the first run
+        '''
+        with self.lock:
+            row = self.db.execute('SELECT run, complete FROM runs WHERE data_extension = ?', (data_extension,)).fetchone()
+        if row is None:
+            return 0, False
+        return row[0], bool(row[1])
+
+    def lookup(self, data_extension, row_key):
+        with self.lock:
+            row = self.db.execute('SELECT hash FROM row_hashes WHERE data_extension = ? AND row_key = ?',
+                                  (data_extension, row_key)).fetchone()
+        return row[0] if row is not None else None
+
+    def mark_seen(self, data_extension, row_keys, run):
+        with self.lock, self.db:
+            self.db.executemany('UPDATE row_hashes SET run = ? WHERE data_extension = ? AND row_key = ?',
+                                [(run, data_extension, row_key) for row_key in row_keys])
+
+    def store(self, data_extension, entries, run):
+        '''
+        entries - (row_key, hash) of rows the server accepted
+        '''
+        with self.lock, self.db:
+            self.db.executemany('INSERT OR REPLACE INTO row_hashes (data_extension, row_key, hash, run) VALUES (?, ?, ?, ?)',
+                                [(data_extension, row_key, row_hash, run) for row_key, row_hash in entries])
+
+    def missing(self, data_extension, run):
+        '''
+        keys that were not seen by the given run
+        '''
+        with self.lock:
+            return [row[0] for row in self.db.execute('SELECT row_key FROM row_hashes WHERE data_extension = ? AND run < ?',
+                                                      (data_extension, run))]
+
+    def remove(self, data_extension, row_keys):
+        with self.lock, self.db:
+            self.db.executemany('DELETE FROM row_hashes WHERE data_extension = ? AND row_key = ?',
+                                [(data_extension, row_key) for row_key in row_keys])
+
+    def reset(self, data_extension):
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM row_hashes WHERE data_extension = ?', (data_extension,))
+            self.db.execute('DELETE FROM runs WHERE data_extension = ?', (data_extension,))
+
+    def close(self):
+        self.db.close()
+
+
+class ETBulkWriter(object):
+    '''
+    Shared batching for the bulk writers: rows are cut into batches of batch_size, each batch is sent
+    by call() on a worker pool with up to max_workers (default FUELSDK_MAX_CONCURRENCY) at once, and
+    only a couple of batches per worker are held in memory.
+
+    Every row gets an outcome keyed by its index in the input:
+    {'StatusCode': 'OK' or 'Error', 'StatusMessage': ..., 'ErrorCode': ...}
+    Rows in a batch that failed as a whole (fault, HTTP error) all get that batch's error.
+    '''
+
+    def __init__(self, auth_stub, batch_size=2500, max_workers=None):
+        self.auth_stub = auth_stub
+        self.batch_size = batch_size
+        self.max_workers = max_workers or exact_target_config.max_concurrency
+
+    def dispatch(self, rows, encode, call):
+        return self.dispatch_batches(chunks(rows, self.batch_size), encode, call)
+
+    def dispatch_batches(self, batches, encode, call):
+        '''
+        batches - (index of the first row, list of rows) as made by chunks()
+        '''
+        in_flight = deque()
+        pool = ETThreadPool(max_workers=self.max_workers, name='FuelSDK-bulk')
+        try:
+            for start, batch in batches:
+                if len(in_flight) >= self.max_workers * 2:
+                    for outcome in self.collect(*in_flight.popleft()):
+                        yield outcome
+                in_flight.append((start, len(batch), pool.submit(self.send, call, encode, batch)))
+
+            while in_flight:
+                for outcome in self.collect(*in_flight.popleft()):
+                    yield outcome
+        finally:
+            pool.shutdown(wait=not in_flight)
+
+    def send(self, call, encode, batch):
+        return call([encode(row) for row in batch])
+
+    def collect(self, start, size, future):
+        try:
+            response = future.result()
+        except Exception as e:
+            logging.exception('Batch of rows {0} to {1} failed'.format(start, start + size - 1))
+            response = None
+            failure = {'StatusCode': 'Error', 'StatusMessage': str(e), 'ErrorCode': None}
+        else:
+            failure = {'StatusCode': 'Error', 'ErrorCode': None,
+                       'StatusMessage': response.message or 'Batch failed with code {0}'.format(response.code)}
+
+        outcomes = {}
+        if response is not None:
+            for position, result in enumerate(response.results):
+                ordinal = get_prop(result, 'OrdinalID')
+                outcomes[position if ordinal is None else ordinal] = {
+                    'StatusCode': get_prop(result, 'StatusCode'),
+                    'StatusMessage': get_prop(result, 'StatusMessage'),
+                    'ErrorCode': get_prop(result, 'ErrorCode'),
+                }
+
+        for i in range(size):
+            yield start + i, outcomes.get(i, failure)
+
+
+class ETDataExtensionRowWriter(ETBulkWriter):
+    '''
+    Bulk upsert into one DataExtension. rows can be any iterable of dicts, or of tuples when columns
+    gives their column order (see column_rows() for a dict of column arrays), including a generator
+    over millions of rows. Each batch is sent as one Update call with SaveAction UpdateAdd.
+    '''
+
+    def __init__(self, auth_stub, name=None, customer_key=None, batch_size=2500, max_workers=None):
+        super(ETDataExtensionRowWriter, self).__init__(auth_stub, batch_size, max_workers)
+        self.row = ETDataExtensionRow()
+        self.row.auth_stub = auth_stub
+        self.row.name = name
+        self.row.customer_key = customer_key
+
+    def upsert(self, rows, columns=None):
+        '''
+        upsert every row and return {input index: outcome}
+        '''
+        return dict(self.iter_upsert(rows, columns))
+
+    def iter_upsert(self, rows, columns=None):
+        '''
+        upsert every row, yielding (input index, outcome) in input order as the batches finish
+        '''
+        self.row.get_customer_key()
+        encoder = ETDataExtensionRowEncoder(self.row.customer_key, columns)
+        encode = encoder.encode_dict if columns is None else encoder.encode
+        return self.dispatch(rows, encode, self.upsert_batch)
+
+    def iter_delta_upsert(self, rows, index, primary_key, columns=None):
+        '''
+        upsert only the rows that are new or have changed since they were last written through index (an
+        ETRowHashIndex), yielding (input index, outcome) for the rows that were sent. primary_key is the
+        list of the DataExtension's primary key fields. A row that fails is sent again by the next run.
+        '''
+        self.row.get_customer_key()
+        name = self.row.customer_key
+        if columns is None:
+            key_values = lambda row: [row[field] for field in primary_key]
+            content = lambda row: sorted(row.iteritems())
+        else:
+            positions = [list(columns).index(field) for field in primary_key]
+            key_values = lambda row: [row[i] for i in positions]
+            content = lambda row: sorted(izip(columns, row))
+
+        run = index.begin(name)
+        pending = {}
+        seen = []
+        stored = []
+
+        def changed_rows():
+            sent = 0
+            for i, row in enumerate(rows):
+                row_key = json.dumps(key_values(row), default=unicode)
+                row_hash = hashlib.sha1(json.dumps(content(row), default=unicode)).hexdigest()
+                if index.lookup(name, row_key) == row_hash:
+                    seen.append(row_key)
+                    if len(seen) >= self.batch_size:
+                        index.mark_seen(name, seen, run)
+                        del seen[:]
+                    continue
+                pending[sent] = (i, row_key, row_hash)
+                sent += 1
+                yield row
+
+        for sent, outcome in self.iter_upsert(changed_rows(), columns):
+            i, row_key, row_hash = pending.pop(sent)
+            if outcome['StatusCode'] == 'OK':
+                stored.append((row_key, row_hash))
+                if len(stored) >= self.batch_size:
+                    index.store(name, stored, run)
+                    del stored[:]
+            else:
+                # keep the old hash so the row is sent again, but don't treat it as deleted
+                seen.append(row_key)
+            yield i, outcome
+
+        index.store(name, stored, run)
+        index.mark_seen(name, seen, run)
+        index.finish(name, run)
+
+    def iter_delete_missing(self, index, primary_key):
+        '''
+        delete the rows that earlier delta runs wrote but the last one did not see, yielding (primary key
+        values, outcome). Only allowed after a delta run that went through all of its rows.
+        '''
+        self.row.get_customer_key()
+        name = self.row.customer_key
+        run, complete = index.last_run(name)
+        if not complete:
+            raise Exception('Unable to delete missing rows of DataExtension {0} without a completed delta run'.format(name))
+
+        row_keys = index.missing(name, run)
+        encoder = ETDataExtensionRowEncoder(self.row.customer_key, primary_key, keys=True)
+        rows = (json.loads(row_key) for row_key in row_keys)
+        removed = []
+        for i, outcome in self.dispatch(rows, encoder.encode, self.delete_batch):
+            if outcome['StatusCode'] == 'OK':
+                removed.append(row_keys[i])
+            yield tuple(json.loads(row_keys[i])), outcome
+        index.remove(name, removed)
+
+    def ingest(self, source, format='csv', column_map=None, buffer_batches=4, encoding='utf-8'):
+        '''
+        stream a CSV (with a header line) or NDJSON file into the DataExtension, yielding (row index, outcome)
+        like iter_upsert. source is a path, an open file or any iterable of lines, read as encoding. The row
+        index counts the records of the file after the header, leaving out blank ones.
+
+        File columns are matched to the DataExtension's fields, fetched through ETDataExtensionColumn,
+        by name ignoring case. column_map renames file columns ({file column: field}), mapping a column to
+        None drops it. Reading and parsing run on a background thread that stays at most buffer_batches
+        batches ahead of the sends, so memory use does not grow with the size of the file. A record that
+        can't be read (a CSV record with more or fewer fields than the header, invalid JSON, an NDJSON key
+        that is not a field, bytes that are not in encoding) is not sent and gets an Error outcome of its
+        own. A byte order mark at the start of the file is skipped.
+        '''
+        if format not in ('csv', 'ndjson'):
+            raise Exception('Unable to ingest format {0}, expected csv or ndjson'.format(format))
+
+        lines = open(source, 'rb') if isinstance(source, basestring) else source
+        try:
+            fields = self.fields()
+            if format == 'csv':
+                records = csv.reader(lines)
+                header = next(records, None)
+                if header is None:
+                    return
+                header = [decode_text(name, encoding) for name in header]
+                if header:
+                    # a byte order mark, as written by Excel, is not part of the first column name
+                    header[0] = header[0].lstrip(u'\ufeff')
+                columns = [self.map_column(name, fields, column_map) for name in header]
+                keep = [i for i, column in enumerate(columns) if column is not None]
+                columns = [columns[i] for i in keep]
+                parsed = self.csv_rows(records, len(header), keep, encoding)
+            else:
+                columns = None
+                parsed = self.ndjson_rows(lines, fields, column_map, encoding)
+
+            batches = (batch for _, batch in chunks(parsed, self.batch_size))
+            parsed = chain.from_iterable(prefetch(batches, depth=buffer_batches))
+            sent = deque()  # record index of each row passed to iter_upsert
+            malformed = deque()
+
+            def rows():
+                for i, row, error in parsed:
+                    if error is None:
+                        sent.append(i)
+                        yield row
+                    else:
+                        malformed.append((i, {'StatusCode': 'Error', 'StatusMessage': error, 'ErrorCode': None}))
+
+            for _, outcome in self.iter_upsert(rows(), columns):
+                i = sent.popleft()
+                while malformed and malformed[0][0] < i:
+                    yield malformed.popleft()
+                yield i, outcome
+            while malformed:
+                yield malformed.popleft()
+        finally:
+            if lines is not source:
+                lines.close()
+
+    def csv_rows(self, records, size, keep, encoding):
+        '''
+        (record index, row tuple, None) for each record that is not blank, (record index, None, error message)
+        for those that can't be read
+        '''
+        i = 0
+        while True:
+            try:
+                record = next(records)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield i, None, 'Unable to parse record: {0}'.format(e)
+                i += 1
+                continue
+            if not any(cell.strip() for cell in record):
+                continue
+            if len(record) != size:
+                yield i, None, 'Unable to ingest record with {0} fields, the header has {1}'.format(len(record), size)
+            else:
+                try:
+                    yield i, tuple([decode_text(record[k], encoding) for k in keep]), None
+                except UnicodeDecodeError as e:
+                    yield i, None, 'Unable to decode record: {0}'.format(e)
+            i += 1
+
+    def fields(self):
+        '''
+        names of the DataExtension's fields
+        '''
+        self.row.get_customer_key()
+        column = ETDataExtensionColumn()
+        column.auth_stub = self.auth_stub
+        column.props = ['Name']
+        column.search_filter = {'Property': 'DataExtension.CustomerKey', 'SimpleOperator': 'equals',
+                                'Value': self.row.customer_key}
+        return [get_prop(result, 'Name') for result in column.iter_results()]
+
+    def map_column(self, name, fields, column_map):
+        if column_map is not None and name in column_map:
+            field = column_map[name]
+            if field is None or field in fields:
+                return field
+        else:
+            matches = [field for field in fields if field.lower() == name.strip().lower()]
+            if matches:
+                return matches[0]
+            field = name
+        raise Exception('Unable to ingest column {0}, {1} is not a field of DataExtension {2}'.format(
+            name, field, self.row.customer_key))
+
+    def ndjson_rows(self, lines, fields, column_map, encoding):
+        '''
+        like csv_rows, with each row a dict of fields
+        '''
+        columns = {}
+        i = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            if i == 0:
+                if isinstance(line, unicode):
+                    line = line.lstrip(u'\ufeff')
+                elif line.startswith(codecs.BOM_UTF8):
+                    line = line[len(codecs.BOM_UTF8):]
+            try:
+                record = json.loads(line, encoding=encoding)
+            except ValueError as e:
+                # UnicodeDecodeError is a ValueError too
+                yield i, None, 'Unable to parse record: {0}'.format(e)
+                i += 1
+                continue
+            if not isinstance(record, dict):
+                yield i, None, 'Unable to ingest record, expected a JSON object'
+                i += 1
+                continue
+            row = {}
+            try:
+                for name, value in record.iteritems():
+                    if name not in columns:
+                        columns[name] = self.map_column(name, fields, column_map)
+                    if columns[name] is not None:
+                        row[columns[name]] = value
+            except Exception as e:
+                # a key that is not a field of the DataExtension
+                yield i, None, str(e)
+            else:
+                yield i, row, None
+            i += 1
+
+    def upsert_batch(self, props):
+        return ETPatch(self.auth_stub, self.row.obj_type, props, update_options=UPSERT_OPTIONS)
+
+    def delete_batch(self, props):
+        return ETDelete(self.auth_stub, self.row.obj_type, props)
+
+
+class ETSubscriberListWriter(ETBulkWriter):
+    '''
+    Bulk form of ETClient.add_subscriber_to_list. Each batch is one Create with SaveAction UpdateAdd,
+    so subscribers that already exist are updated by the same call rather than by a second Update after
+    error 12014. A subscriber that appears more than once in a batch is sent once with all of its lists.
+    '''
+
+    def upsert(self, subscribers):
+        '''
+        add or update every subscriber and return {input index: outcome}
+        '''
+        return dict(self.iter_upsert(subscribers))
+
+    def iter_upsert(self, subscribers):
+        '''
+        subscribers - iterable of (email_address, list_ids) or (email_address, list_ids, subscriber_key)
+
+        yields (input index, outcome) as the batches finish, repeats of a subscriber get the outcome of
+        the merged subscriber
+        '''
+        pending = {}
+
+        def batches():
+            sent = 0
+            for start, batch in chunks(subscribers, self.batch_size):
+                merged = OrderedDict()
+                for i, subscriber in enumerate(batch, start):
+                    email_address, list_ids = subscriber[0], subscriber[1]
+                    subscriber_key = subscriber[2] if len(subscriber) > 2 else None
+                    key = subscriber_key if subscriber_key is not None else email_address.lower()
+                    if key in merged:
+                        props, indexes = merged[key]
+                        props['Lists'].extend({'ID': list_id} for list_id in list_ids if {'ID': list_id} not in props['Lists'])
+                        indexes.append(i)
+                        continue
+                    props = {'EmailAddress': email_address, 'Lists': [{'ID': list_id} for list_id in list_ids]}
+                    if subscriber_key is not None:
+                        props['SubscriberKey'] = subscriber_key
+                    merged[key] = (props, [i])
+
+                for position, (_, indexes) in enumerate(merged.itervalues()):
+                    pending[sent + position] = indexes
+                yield sent, [props for props, _ in merged.itervalues()]
+                sent += len(merged)
+
+        for sent, outcome in self.dispatch_batches(batches(), lambda props: props, self.upsert_batch):
+            for i in pending.pop(sent):
+                yield i, outcome
+
+    def upsert_batch(self, props):
+        return ETPost(self.auth_stub, 'Subscriber', props, create_options=UPSERT_OPTIONS)
@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from .objects import ETDataExtension
+from .rest import ETDescribe
+
+
+class ETTTLCache(object):
+    '''
+    Thread safe in-process cache, entries expire ttl seconds after they are set
+    '''
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self.entries[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value, expires=None):
+        with self.lock:
+            self.entries[key] = (expires or time.time() + self.ttl, value)
+
+    def invalidate(self, key=None):
+        '''
+        drop one entry, or everything when key is None
+        '''
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+
+class ETDescribeCache(object):
+    '''
+    Describe results by obj_type so ETGet without props and ETGetSupport.info() only make the
+    Describe call once per ttl. With path set, the retrievable property names are also kept in that
+    JSON file so they survive restarts and are shared by processes on the host.
+    '''
+
+    def __init__(self, ttl=86400, path=None):
+        self.ttl = ttl
+        self.path = path
+        self.describes = ETTTLCache(ttl)
+        self.retrievable = ETTTLCache(ttl)
+        self.file_lock = threading.Lock()
+
+    def describe(self, auth_stub, obj_type):
+        describe = self.describes.get(obj_type)
+        if describe is None:
+            describe = ETDescribe(auth_stub, obj_type)
+            if describe.status:
+                self.describes.set(obj_type, describe)
+        return describe
+
+    def retrievable_props(self, auth_stub, obj_type):
+        props = self.retrievable.get(obj_type)
+        if props is not None:
+            return props
+
+        expires, props = self.read_file().get(obj_type, (0, None))
+        if props is not None and expires > time.time():
+            self.retrievable.set(obj_type, props, expires)
+            return props
+
+        describe = self.describe(auth_stub, obj_type)
+        props = [prop.Name for prop in describe.results[0].Properties if prop.IsRetrievable]
+        if describe.status:
+            self.retrievable.set(obj_type, props)
+            self.write_file(obj_type, props)
+        return props
+
+    def invalidate(self, obj_type=None):
+        '''
+        forget one obj_type, or every one when obj_type is None, in memory and on disk
+        '''
+        self.describes.invalidate(obj_type)
+        self.retrievable.invalidate(obj_type)
+        if self.path is not None:
+            with self.file_lock:
+                entries = {} if obj_type is None else self.read_file()
+                entries.pop(obj_type, None)
+                self.replace_file(entries)
+
+    def read_file(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def write_file(self, obj_type, props):
+        if self.path is None:
+            return
+        with self.file_lock:
+            entries = self.read_file()
+            entries[obj_type] = (time.time() + self.ttl, props)
+            self.replace_file(entries)
+
+    def replace_file(self, entries):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, tmp_name = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.rename(tmp_name, self.path)
+        except (IOError, OSError):
+            logging.exception('Unable to write Describe cache {0}'.format(self.path))
+
+
+class ETDataExtensionKeyCache(object):
+    '''
+    DataExtension Name <-> CustomerKey lookups for ETDataExtensionRow, so a row object created without
+    both only costs a DataExtension Retrieve once per ttl. preload() fills it for every DataExtension
+    in the account with a single paged Retrieve.
+    '''
+
+    def __init__(self, ttl=3600):
+        self.keys = ETTTLCache(ttl)  # Name -> CustomerKey
+        self.names = ETTTLCache(ttl)  # CustomerKey -> Name
+
+    def customer_key(self, auth_stub, name):
+        customer_key = self.keys.get(name)
+        if customer_key is None:
+            customer_key = self.lookup(auth_stub, 'Name', name)['CustomerKey']
+        return customer_key
+
+    def name(self, auth_stub, customer_key):
+        name = self.names.get(customer_key)
+        if name is None:
+            name = self.lookup(auth_stub, 'CustomerKey', customer_key)['Name']
+        return name
+
+    def add(self, name, customer_key):
+        self.keys.set(name, customer_key)
+        self.names.set(customer_key, name)
+
+    def invalidate(self, name=None, customer_key=None):
+        '''
+        forget a DataExtension by either side of the mapping, or everything when neither is given
+        '''
+        if name is None and customer_key is None:
+            self.keys.invalidate()
+            self.names.invalidate()
+            return
+
+        if customer_key is None:
+            customer_key = self.keys.get(name)
+        if name is None:
+            name = self.names.get(customer_key)
+        if name is not None:
+            self.keys.invalidate(name)
+        if customer_key is not None:
+            self.names.invalidate(customer_key)
+
+    def preload(self, auth_stub):
+        de = ETDataExtension()
+        de.auth_stub = auth_stub
+        de.props = ['Name', 'CustomerKey']
+        count = 0
+        for result in de.iter_results():
+            self.add(result['Name'], result['CustomerKey'])
+            count += 1
+        return count
+
+    def lookup(self, auth_stub, prop, value):
+        de = ETDataExtension()
+        de.auth_stub = auth_stub
+        de.props = ['Name', 'CustomerKey']
+        de.search_filter = {'Property': prop, 'SimpleOperator': 'equals', 'Value': value}
+        get_response = de.get()
+        if get_response.status and len(get_response.results) == 1:
+            result = get_response.results[0]
+            self.add(result['Name'], result['CustomerKey'])
+            return result
+        raise Exception('Unable to process DataExtension::Row request due to unable to find DataExtension based on {0}'.format(prop))
@@ -1,16 +1,25 @@
 import os
 import logging
+import threading
 import time
 import json
 
 import jwt
-import requests
 import suds.client
 import suds.wsse
 from suds.sax.element import Element
 
+from .bulk import ETSubscriberListWriter
+from .cache import ETDataExtensionKeyCache, ETDescribeCache
 from .config import exact_target_config
+from .envelope import ETDataExtensionEnvelope
+from .factory import ETObjectFactory
 from .objects import ETDataExtension, ETSubscriber
+from .session import build_http_session
+from .stream import ETResultDecoder
+from .token_store import ETFileTokenStore
+from .transport import ETHttpTransport
+from .wsdl_cache import ETWsdlCache, purge_wsdl_cache
 
 TIMEOUT = 600  # make the timeout 10 minutes
 
@@ -25,6 +34,10 @@ class ETClient(object):
     client_secret = None
     app_signature = None
     wsdl_file_url = None
+    wsdl_file_location = None
+    wsdl_cache_dir = None
+    soap_connect_timeout = None
+    soap_read_timeout = None
     auth_token = None
     internal_auth_token = None
     auth_token_expiration = None  # seconds since epoch that the current jwt token will expire
@@ -32,11 +45,22 @@ class ETClient(object):
     endpoint = None
     auth_obj = None
     soap_client = None
+    soap_factory = None
+    result_decoder = None
     auth_url = None
+    token_store = None
+    http_session = None
+    describe_cache = None
+    data_extension_keys = None
+    data_extension_envelope = None
+    token_lock = None
+    token_renewer = None
+    token_renewer_stop = None
 
     # get_server_wsdl - if True and a newer WSDL is on the server than the local filesystem retrieve it
     def __init__(self, get_server_wsdl=False, debug=False, params=None):
         self.debug = debug
+        self.token_lock = threading.Lock()
         if debug:
             logging.basicConfig(level=logging.INFO)
             logging.getLogger('suds.client').setLevel(logging.DEBUG)
@@ -85,6 +109,73 @@ class ETClient(object):
         else:
             wsdl_file_local_location = config.wsdl_file_local_loc
 
+        # parsed schema cache location, an empty value falls back to the suds default cache
+        if params is not None and 'wsdl_cache_dir' in params:
+            self.wsdl_cache_dir = params['wsdl_cache_dir']
+        else:
+            self.wsdl_cache_dir = config.wsdl_cache_dir
+
+        # pooled keep-alive session used for every REST and auth call
+        http_options = {}
+        for option in ('pool_connections', 'pool_maxsize', 'pool_block', 'keep_alive'):
+            key = 'http_{0}'.format(option)
+            if params is not None and key in params:
+                http_options[option] = params[key]
+            else:
+                http_options[option] = getattr(config, key)
+        self.http_session = build_http_session(**http_options)
+
+        # SOAP calls go over the same pool through ETHttpTransport
+        if params is not None and 'soap_connect_timeout' in params:
+            self.soap_connect_timeout = params['soap_connect_timeout']
+        else:
+            self.soap_connect_timeout = config.soap_connect_timeout
+
+        if params is not None and 'soap_read_timeout' in params:
+            self.soap_read_timeout = params['soap_read_timeout']
+        else:
+            self.soap_read_timeout = config.soap_read_timeout
+
+        # Describe results are cached per obj_type, a ttl of 0 turns the cache off
+        if params is not None and 'describe_cache_ttl' in params:
+            describe_cache_ttl = params['describe_cache_ttl']
+        else:
+            describe_cache_ttl = config.describe_cache_ttl
+
+        if params is not None and 'describe_cache_file' in params:
+            describe_cache_file = params['describe_cache_file']
+        else:
+            describe_cache_file = config.describe_cache_file
+
+        if describe_cache_ttl:
+            self.describe_cache = ETDescribeCache(describe_cache_ttl, describe_cache_file)
+
+        # DataExtension Name <-> CustomerKey lookups, a ttl of 0 turns the cache off
+        if params is not None and 'data_extension_key_cache_ttl' in params:
+            data_extension_key_cache_ttl = params['data_extension_key_cache_ttl']
+        else:
+            data_extension_key_cache_ttl = config.data_extension_key_cache_ttl
+
+        if data_extension_key_cache_ttl:
+            self.data_extension_keys = ETDataExtensionKeyCache(data_extension_key_cache_ttl)
+
+        # write DataExtensionObject Create/Update/Delete envelopes directly instead of through suds
+        if params is not None and 'fast_data_extension_xml' in params:
+            fast_data_extension_xml = params['fast_data_extension_xml']
+        else:
+            fast_data_extension_xml = config.fast_data_extension_xml
+
+        if fast_data_extension_xml:
+            self.data_extension_envelope = ETDataExtensionEnvelope(self)
+
+        # optional token file shared by every process on this host
+        if params is not None and 'token_store_file' in params:
+            token_store_file = params['token_store_file']
+        else:
+            token_store_file = config.token_store_file
+        if token_store_file:
+            self.token_store = ETFileTokenStore(token_store_file)
+
         self.wsdl_file_url = self.load_wsdl(wsdl_server_url, wsdl_file_local_location, get_server_wsdl)
 
         # get the JWT from the params if passed in...or go to the server to get it
@@ -99,6 +190,10 @@ class ETClient(object):
         else:
             self.refresh_token()
 
+        # optionally renew the token in the background ahead of expiry so request threads never wait on it
+        if params is not None and params.get('token_renewal'):
+            self.start_token_renewal()
+
     def load_wsdl(self, wsdl_url, wsdl_file_local_location, get_server_wsdl=False):
         """
         retrieve the url of the ExactTarget wsdl...either file: or http:
@@ -111,12 +206,13 @@ class ETClient(object):
             path = os.path.dirname(os.path.abspath(__file__))
             file_location = os.path.join(path, 'ExactTargetWSDL.xml')
         file_url = 'file:///' + file_location
+        self.wsdl_file_location = file_location
 
         # if there is no local copy or local copy is empty then go get it
         if not os.path.exists(file_location) or os.path.getsize(file_location) == 0:
             self.retrieve_server_wsdl(wsdl_url, file_location)
         elif get_server_wsdl:
-            r = requests.head(wsdl_url)
+            r = self.http_session.head(wsdl_url)
             if r is not None and 'last-modified' in r.headers:
                 server_wsdl_updated = time.strptime(r.headers['last-modified'], '%a, %d %b %Y %H:%M:%S %Z')
                 file_wsdl_updated = time.gmtime(os.path.getmtime(file_location))
@@ -129,59 +225,188 @@ class ETClient(object):
         """
         get the WSDL from the server and save it locally
         """
-        r = requests.get(wsdl_url, timeout=TIMEOUT)
-        f = open(file_location, 'w')
-        f.write(r.text)
+        r = self.http_session.get(wsdl_url, timeout=TIMEOUT)
+        purge_wsdl_cache(self.wsdl_cache_dir, file_location)
+
+        # write beside the target and rename so other processes never parse a partial WSDL
+        tmp_location = '{0}.{1}.tmp'.format(file_location, os.getpid())
+        with open(tmp_location, 'wb') as f:
+            f.write(r.content)
+        os.rename(tmp_location, file_location)
 
     def build_soap_client(self):
+        """
+        parse the WSDL into a suds client the first time through, after that only the
+        oAuth header and endpoint are swapped on the live client
+        """
         if self.endpoint is None:
             self.endpoint = self.determine_stack()
 
         self.auth_obj = {'oAuth': {'oAuthToken': self.internal_auth_token},
                          'attributes': {'oAuth': {'xmlns': 'http://exacttarget.com'}}}
 
-        self.soap_client = suds.client.Client(self.wsdl_file_url, faults=False, cachingpolicy=1)
-        self.soap_client.set_options(location=self.endpoint)
-
+        if self.soap_client is None:
+            transport = ETHttpTransport(self.http_session, self.soap_connect_timeout, self.soap_read_timeout)
+            if self.wsdl_cache_dir:
+                cache = ETWsdlCache(self.wsdl_cache_dir, self.wsdl_file_location)
+                self.soap_client = suds.client.Client(self.wsdl_file_url, faults=False, cachingpolicy=1,
+                                                      transport=transport, cache=cache)
+            else:
+                self.soap_client = suds.client.Client(self.wsdl_file_url, faults=False, cachingpolicy=1,
+                                                      transport=transport)
+            self.soap_client.set_options(timeout=TIMEOUT)
+
+            security = suds.wsse.Security()
+            token = suds.wsse.UsernameToken('*', '*')
+            security.tokens.append(token)
+            self.soap_client.set_options(wsse=security)
+            self.soap_factory = ETObjectFactory(self.soap_client)
+            self.result_decoder = ETResultDecoder(self.soap_client.wsdl.schema)
+
+        self.update_soap_client_auth()
+
+    def update_soap_client_auth(self):
+        """
+        point the existing suds client at the current endpoint and oAuth token
+        """
         element_oauth = Element('oAuth', ns=('etns', 'http://exacttarget.com'))
         element_oauth_token = Element('oAuthToken').setText(self.internal_auth_token)
         element_oauth.append(element_oauth_token)
-        self.soap_client.set_options(soapheaders=element_oauth, timeout=TIMEOUT)
-
-        security = suds.wsse.Security()
-        token = suds.wsse.UsernameToken('*', '*')
-        security.tokens.append(token)
-        self.soap_client.set_options(wsse=security)
+        self.soap_client.set_options(location=self.endpoint, soapheaders=element_oauth)
 
     def refresh_token(self, force_refresh=False):
         """
-        Called from many different places right before executing a SOAP call
+        Called from many different places right before executing a SOAP call.
+        Thread safe, when several threads find the token expiring only one of them refreshes
+        and the rest wait for it and use the token it got.
         """
         # If we don't already have a token or the token expires within 10 min(600 seconds), get one
-        token_has_expired = self.auth_token_expiration is None or time.time() + 600 > self.auth_token_expiration
-
-        if force_refresh or self.auth_token is None or token_has_expired:
-            logging.log(level=logging.INFO, msg='Refreshing Exact Target Token')
-            headers = {'content-type': 'application/json'}
-            payload = {
-                'clientId': self.client_id,
-                'clientSecret': self.client_secret,
-            }
+        if force_refresh or self.auth_token is None or self.token_has_expired(self.auth_token_expiration):
+            with self.token_lock:
+                # check again, another thread may have refreshed while this one waited on the lock
+                if not (force_refresh or self.auth_token is None or self.token_has_expired(self.auth_token_expiration)):
+                    return
 
-            r = requests.post(self.auth_url, data=json.dumps(payload), headers=headers, timeout=TIMEOUT)
-            token_response = r.json()
+                if self.token_store is not None:
+                    self.refresh_token_from_store(force_refresh)
+                else:
+                    self.request_token()
 
-            if 'accessToken' not in token_response:
-                payload['clientSecret'] = '******'  # don't log the secret
-                raise Exception('Unable authorize with: {0} response: {1}'.format(payload, token_response))
+                self.build_soap_client()
 
-            self.auth_token = token_response['accessToken']
-            self.auth_token_expiration = time.time() + token_response['expiresIn']
-            self.internal_auth_token = token_response['legacyToken']
-            if 'refreshToken' in token_response:
-                self.refresh_key = token_response['refreshToken']
+    def start_token_renewal(self, lead_time=60, retry_interval=30):
+        """
+        start a daemon thread that refreshes the token lead_time seconds before refresh_token()
+        would consider it expired
+        """
+        if self.token_renewer is not None and self.token_renewer.is_alive():
+            return
+
+        self.token_renewer_stop = threading.Event()
+        self.token_renewer = threading.Thread(target=self.renew_token_loop,
+                                              args=(self.token_renewer_stop, lead_time, retry_interval),
+                                              name='FuelSDK-token-renewal')
+        self.token_renewer.daemon = True
+        self.token_renewer.start()
+
+    def stop_token_renewal(self):
+        if self.token_renewer is not None:
+            self.token_renewer_stop.set()
+            self.token_renewer.join()
+            self.token_renewer = None
+
+    def renew_token_loop(self, stop, lead_time, retry_interval):
+        while not stop.is_set():
+            if self.seconds_until_renewal(lead_time) > 0:
+                stop.wait(self.seconds_until_renewal(lead_time))
+                continue
+
+            try:
+                self.refresh_token(force_refresh=True)
+            except Exception:
+                logging.exception('Background token renewal failed, retrying in {0} seconds'.format(retry_interval))
+            else:
+                if self.seconds_until_renewal(lead_time) > 0:
+                    continue
+            # failed, or the new token is too short lived to renew ahead of time
+            stop.wait(retry_interval)
+
+    def seconds_until_renewal(self, lead_time):
+        return (self.auth_token_expiration or 0) - 600 - lead_time - time.time()
+
+    @staticmethod
+    def token_has_expired(expiration):
+        return expiration is None or time.time() + 600 > expiration
+
+    def request_token(self):
+        """
+        go to the auth endpoint for a new token
+        """
+        logging.log(level=logging.INFO, msg='Refreshing Exact Target Token')
+        headers = {'content-type': 'application/json'}
+        payload = {
+            'clientId': self.client_id,
+            'clientSecret': self.client_secret,
+        }
+
+        r = self.http_session.post(self.auth_url, data=json.dumps(payload), headers=headers, timeout=TIMEOUT)
+        token_response = r.json()
+
+        if 'accessToken' not in token_response:
+            payload['clientSecret'] = '******'  # don't log the secret
+            raise Exception('Unable authorize with: {0} response: {1}'.format(payload, token_response))
+
+        self.auth_token = token_response['accessToken']
+        self.auth_token_expiration = time.time() + token_response['expiresIn']
+        self.internal_auth_token = token_response['legacyToken']
+        if 'refreshToken' in token_response:
+            self.refresh_key = token_response['refreshToken']
+
+    def refresh_token_from_store(self, force_refresh=False):
+        """
+        use the token shared by other processes on this host, only going to the auth endpoint
+        (one process at a time) when the shared token is about to expire
+        """
+        key = self.token_store.key(self.client_id, self.auth_url)
+
+        entry = self.token_store.load(key)
+        if not force_refresh and self.apply_stored_token(entry):
+            return
+
+        with self.token_store.lock():
+            # another process may have refreshed while we were waiting on the lock, when forcing
+            # a refresh only a token other than the one being replaced will do
+            entry = self.token_store.load(key)
+            replaced = entry is not None and entry['accessToken'] != self.auth_token
+            if (replaced or not force_refresh) and self.apply_stored_token(entry):
+                return
+
+            self.request_token()
+            if self.endpoint is None:
+                self.endpoint = self.determine_stack()
+
+            self.token_store.save(key, {
+                'accessToken': self.auth_token,
+                'legacyToken': self.internal_auth_token,
+                'refreshToken': self.refresh_key,
+                'expiration': self.auth_token_expiration,
+                'endpoint': self.endpoint,
+            })
+
+    def apply_stored_token(self, entry):
+        """
+        take the token from a token store entry if it is still good, returns False when it is not
+        """
+        if entry is None or self.token_has_expired(entry['expiration']):
+            return False
 
-            self.build_soap_client()
+        self.auth_token = entry['accessToken']
+        self.auth_token_expiration = entry['expiration']
+        self.internal_auth_token = entry['legacyToken']
+        self.refresh_key = entry['refreshToken']
+        if self.endpoint is None:
+            self.endpoint = entry['endpoint']
+        return True
 
     def determine_stack(self):
         """
@@ -189,7 +414,7 @@ class ETClient(object):
         """
         try:
             url = 'https://www.exacttargetapis.com/platform/v1/endpoints/soap?access_token={0}'.format(self.auth_token)
-            r = requests.get(url, timeout=TIMEOUT)
+            r = self.http_session.get(url, timeout=TIMEOUT)
             context_response = r.json()
             if 'url' in context_response:
                 return str(context_response['url'])
@@ -224,6 +449,15 @@ class ETClient(object):
 
         return post_response
 
+    def add_subscribers_to_lists(self, subscribers, batch_size=2500, max_workers=None):
+        """
+        add or update many subscribers with their lists in batched, concurrent upserts
+        subscribers - iterable of (email_address, list_ids) or (email_address, list_ids, subscriber_key)
+        returns {input index: outcome}, see ETSubscriberListWriter
+        """
+        writer = ETSubscriberListWriter(self, batch_size=batch_size, max_workers=max_workers)
+        return writer.upsert(subscribers)
+
     def create_data_extensions(self, data_extension_definitions):
         """
         write the data extension props to the web service
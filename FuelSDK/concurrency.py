@@ -0,0 +1,191 @@
+import sys
+import threading
+import Queue
+
+
+class ETFuture(object):
+    '''
+    Result of a call running on another thread
+    '''
+
+    def __init__(self):
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+        self._result = None
+        self._exc_info = None
+        self._callbacks = []
+
+    def done(self):
+        return self._finished.is_set()
+
+    def result(self, timeout=None):
+        '''
+        wait for the call to finish and return its result, re-raising whatever the call raised
+        '''
+        if not self._finished.wait(timeout) and not self.done():
+            raise Exception('Timed out after {0} seconds waiting for result'.format(timeout))
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def exception(self, timeout=None):
+        try:
+            self.result(timeout)
+        except Exception as e:
+            return e
+        return None
+
+    def add_done_callback(self, fn):
+        '''
+        fn(future) runs once the call finishes, straight away if it already has
+        '''
+        with self._lock:
+            if not self.done():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def set_result(self, result):
+        self._result = result
+        self._finish()
+
+    def set_exception(self, exc_info):
+        self._exc_info = exc_info
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._finished.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+
+def as_completed(futures):
+    '''
+    yield the futures as they finish
+    '''
+    finished = Queue.Queue()
+    futures = list(futures)
+    for future in futures:
+        future.add_done_callback(finished.put)
+    for _ in futures:
+        yield finished.get()
+
+
+def prefetch(iterable, depth=1):
+    '''
+    iterate over iterable on a background thread, keeping up to depth items ready ahead of the
+    consumer so producing the next item overlaps with processing the current one
+    '''
+    return merge([iterable], buffer_size=depth)
+
+
+def merge(iterables, buffer_size=1, max_workers=None):
+    '''
+    iterate over each of iterables on its own background thread (at most max_workers at once) and
+    yield their items in arrival order. At most buffer_size items wait for the consumer, the
+    producers block beyond that. An exception in a producer is raised in the consumer.
+    '''
+    iterables = list(iterables)
+    buffered = Queue.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        # give up once the consumer has gone away instead of blocking forever on a full queue
+        while not stop.is_set():
+            try:
+                buffered.put(item, timeout=0.1)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def produce(iterable):
+        if stop.is_set():
+            return
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException:
+            put((end, sys.exc_info()))
+        else:
+            put((end, None))
+
+    workers = min(max_workers or len(iterables), len(iterables)) or 1
+    pool = ETThreadPool(max_workers=workers, max_pending=len(iterables) + workers, name='FuelSDK-merge')
+    for iterable in iterables:
+        pool.submit(produce, iterable)
+
+    remaining = len(iterables)
+    try:
+        while remaining:
+            item, exc_info = buffered.get()
+            if item is end:
+                if exc_info is not None:
+                    raise exc_info[0], exc_info[1], exc_info[2]
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        # producers that are still running when the consumer stops early exit at their next item
+        stop.set()
+        pool.shutdown(wait=not remaining)
+
+
+class ETThreadPool(object):
+    '''
+    Fixed set of daemon worker threads. At most max_workers calls run at once and submit()
+    blocks once max_pending calls are waiting, so a fast producer cannot queue unbounded work.
+    '''
+
+    def __init__(self, max_workers=8, max_pending=None, name='FuelSDK-worker'):
+        if max_pending is None:
+            max_pending = max_workers * 2
+        self.max_workers = max_workers
+        self.work = Queue.Queue(maxsize=max_pending)
+        self.threads = []
+        for i in range(max_workers):
+            t = threading.Thread(target=self._worker, name='{0}-{1}'.format(name, i))
+            t.daemon = True
+            t.start()
+            self.threads.append(t)
+
+    def submit(self, fn, *args, **kwargs):
+        future = ETFuture()
+        self.work.put((future, fn, args, kwargs))
+        return future
+
+    def map(self, fn, iterable):
+        '''
+        submit fn(item) for every item and return the futures in input order
+        '''
+        return [self.submit(fn, item) for item in iterable]
+
+    def shutdown(self, wait=True):
+        for _ in self.threads:
+            self.work.put(None)
+        if wait:
+            for t in self.threads:
+                t.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def _worker(self):
+        while True:
+            item = self.work.get()
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                future.set_exception(sys.exc_info())
+            else:
+                future.set_result(result)
@@ -12,6 +12,19 @@ class ExactTargetConfig(object):
     default_wsdl = os.environ.get('FUELSDK_DEFAULT_WSDL', 'https://webservice.exacttarget.com/etframework.wsdl')
     authentication_url = os.environ.get('FUELSDK_AUTH_URL', 'https://auth.exacttargetapis.com/v1/requestToken?legacy=1')
     wsdl_file_local_loc = os.environ.get('FUELSDK_WSDL_FILE_LOCAL_LOC', '/tmp/ExactTargetWSDL.s6.xml')
+    wsdl_cache_dir = os.environ.get('FUELSDK_WSDL_CACHE_DIR', '/tmp/FuelSDK-wsdl-cache')
+    token_store_file = os.environ.get('FUELSDK_TOKEN_STORE_FILE', None)
+    http_pool_connections = int(os.environ.get('FUELSDK_HTTP_POOL_CONNECTIONS', 10))
+    http_pool_maxsize = int(os.environ.get('FUELSDK_HTTP_POOL_MAXSIZE', 10))
+    http_pool_block = os.environ.get('FUELSDK_HTTP_POOL_BLOCK', 'false').lower() == 'true'
+    http_keep_alive = os.environ.get('FUELSDK_HTTP_KEEP_ALIVE', 'true').lower() == 'true'
+    soap_connect_timeout = float(os.environ.get('FUELSDK_SOAP_CONNECT_TIMEOUT', 30))
+    soap_read_timeout = float(os.environ.get('FUELSDK_SOAP_READ_TIMEOUT', 600))
+    max_concurrency = int(os.environ.get('FUELSDK_MAX_CONCURRENCY', 8))
+    describe_cache_ttl = int(os.environ.get('FUELSDK_DESCRIBE_CACHE_TTL', 86400))
+    describe_cache_file = os.environ.get('FUELSDK_DESCRIBE_CACHE_FILE', None)
+    data_extension_key_cache_ttl = int(os.environ.get('FUELSDK_DATA_EXTENSION_KEY_CACHE_TTL', 3600))
+    fast_data_extension_xml = os.environ.get('FUELSDK_FAST_DATA_EXTENSION_XML', 'false').lower() == 'true'
 
 
 exact_target_config = ExactTargetConfig()
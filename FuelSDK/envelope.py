@@ -0,0 +1,181 @@
+from itertools import izip
+from xml.sax.saxutils import escape
+
+from suds.client import SoapClient
+from suds.transport import Request, TransportError
+
+# the same namespaces, WS-Security token and oAuth header suds writes for ETClient
+ENVELOPE_HEAD = (u'<?xml version="1.0" encoding="UTF-8"?>'
+                 u'<SOAP-ENV:Envelope xmlns:etns="http://exacttarget.com" '
+                 u'xmlns:wsse="http://docs.oasis-open.org/wss/2004/01/oasis-200401-wss-wssecurity-secext-1.0.xsd" '
+                 u'xmlns:ns0="http://exacttarget.com/wsdl/partnerAPI" '
+                 u'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+                 u'xmlns:SOAP-ENV="http://schemas.xmlsoap.org/soap/envelope/">'
+                 u'<SOAP-ENV:Header><wsse:Security mustUnderstand="true"><wsse:UsernameToken>'
+                 u'<wsse:Username>*</wsse:Username><wsse:Password>*</wsse:Password>'
+                 u'</wsse:UsernameToken></wsse:Security>'
+                 u'<etns:oAuth><oAuthToken>{0}</oAuthToken></etns:oAuth></SOAP-ENV:Header>'
+                 u'<SOAP-ENV:Body><ns0:{1}Request>')
+ENVELOPE_TAIL = u'</ns0:{0}Request></SOAP-ENV:Body></SOAP-ENV:Envelope>'
+
+# DataExtensionObject fields that can be written, in schema order (APIObject, ObjectExtension, DataExtensionObject)
+OBJECT_FIELDS = ('CustomerKey', 'Properties', 'Name', 'Keys')
+CONTAINERS = {'Properties': 'Property', 'Keys': 'Key'}
+OPTION_FIELDS = ('SaveOptions', 'RequestType')
+
+
+class Unsupported(Exception):
+    pass
+
+
+def text(value):
+    '''
+    escaped element text, converted the way suds does except byte strings are read as utf-8
+    '''
+    if isinstance(value, str):
+        value = value.decode('utf-8')
+    elif not isinstance(value, unicode):
+        value = unicode(value)
+    return escape(value)
+
+
+def items(value):
+    return value if type(value) is list else [value]
+
+
+def check_fields(value, fields):
+    if type(value) is not dict or not set(value).issubset(fields):
+        raise Unsupported()
+
+
+class ETEncodedRow(object):
+    '''
+    One DataExtensionObject as made by ETDataExtensionRowEncoder: the encoder plus the row's field names
+    and values, without a dict per field. ETDataExtensionEnvelope writes it as it is, as_props() gives
+    the props dict suds takes.
+    '''
+
+    __slots__ = ('encoder', 'names', 'values')
+
+    def __init__(self, encoder, names, values):
+        self.encoder = encoder
+        self.names = names
+        self.values = values
+
+    def as_props(self):
+        encoder = self.encoder
+        return {'CustomerKey': encoder.customer_key,
+                encoder.container: {encoder.field: [{'Name': name, 'Value': value} for name, value in izip(self.names, self.values)]}}
+
+
+class ETDataExtensionEnvelope(object):
+    '''
+    Writes Create, Update and Delete calls for DataExtensionObject straight into the SOAP envelope,
+    skipping the suds factory objects and marshaller that take most of the time of a row write. The
+    reply still goes through suds, so callers get the same response as before.
+
+    Only the fields used for rows are written (CustomerKey, Name, Properties, Keys and the
+    SaveOptions/RequestType options); build() returns None for anything else and the call is made
+    through suds as usual.
+    '''
+
+    obj_type = 'DataExtensionObject'
+
+    def __init__(self, auth_stub):
+        self.auth_stub = auth_stub
+        self.field_heads = {}  # (field, name) -> opening of that field's element, up to its Value
+
+    def build(self, method, props, options=None):
+        '''
+        the method call for props (a dict or list of dicts) as utf-8 bytes, None when suds has to write it
+        '''
+        parts = [ENVELOPE_HEAD.format(text(self.auth_stub.internal_auth_token), method)]
+        try:
+            if options is not None:
+                self.write_options(parts, options)
+            for row in items(props):
+                if type(row) is ETEncodedRow:
+                    self.write_encoded(parts, row)
+                else:
+                    self.write_object(parts, row)
+        except Unsupported:
+            return None
+        parts.append(ENVELOPE_TAIL.format(method))
+        return u''.join(parts).encode('utf-8')
+
+    def send(self, method, envelope):
+        '''
+        post an envelope made by build() and decode the reply with suds, returns (code, body) like a suds call
+        '''
+        soap_client = self.auth_stub.soap_client
+        soap_method = getattr(soap_client.service, method).method
+        soap = SoapClient(soap_client, soap_method)
+        binding = soap_method.binding.input
+        request = Request(soap.location(), envelope)
+        request.headers = soap.headers()
+        try:
+            reply = soap_client.options.transport.send(request)
+        except TransportError as e:
+            if e.httpcode in (202, 204):
+                return None
+            return soap.failed(binding, e)
+        return soap.succeeded(binding, reply.message)
+
+    def write_object(self, parts, row):
+        check_fields(row, OBJECT_FIELDS)
+        parts.append(u'<ns0:Objects xsi:type="ns0:DataExtensionObject">')
+        for field in OBJECT_FIELDS:
+            value = row.get(field)
+            if value is None:
+                continue
+            if field in CONTAINERS:
+                self.write_properties(parts, field, CONTAINERS[field], value)
+            else:
+                parts.append(u'<ns0:{0}>{1}</ns0:{0}>'.format(field, text(value)))
+        parts.append(u'</ns0:Objects>')
+
+    def write_encoded(self, parts, row):
+        encoder = row.encoder
+        parts.append(u'<ns0:Objects xsi:type="ns0:DataExtensionObject">')
+        if encoder.customer_key is not None:
+            parts.append(u'<ns0:CustomerKey>{0}</ns0:CustomerKey>'.format(text(encoder.customer_key)))
+        parts.append(u'<ns0:{0}>'.format(encoder.container))
+        field = encoder.field
+        close = u'</ns0:{0}>'.format(field)
+        for name, value in izip(row.names, row.values):
+            head = self.field_heads.get((field, name))
+            if head is None:
+                head = self.field_heads[(field, name)] = u'<ns0:{0}><ns0:Name>{1}</ns0:Name>'.format(field, text(name))
+            parts.append(head)
+            parts.append(u'<ns0:Value/>' if value is None else u'<ns0:Value>' + text(value) + u'</ns0:Value>')
+            parts.append(close)
+        parts.append(u'</ns0:{0}></ns0:Objects>'.format(encoder.container))
+
+    def write_properties(self, parts, container, field, value):
+        check_fields(value, (field,))
+        parts.append(u'<ns0:{0}>'.format(container))
+        for prop in items(value.get(field) or []):
+            check_fields(prop, ('Name', 'Value'))
+            if prop.get('Value') is None:
+                parts.append(u'<ns0:{0}><ns0:Name>{1}</ns0:Name><ns0:Value/></ns0:{0}>'.format(field, text(prop['Name'])))
+            else:
+                parts.append(u'<ns0:{0}><ns0:Name>{1}</ns0:Name><ns0:Value>{2}</ns0:Value></ns0:{0}>'.format(
+                    field, text(prop['Name']), text(prop['Value'])))
+        parts.append(u'</ns0:{0}>'.format(container))
+
+    def write_options(self, parts, options):
+        check_fields(options, OPTION_FIELDS)
+        parts.append(u'<ns0:Options>')
+        save_options = options.get('SaveOptions')
+        if save_options is not None:
+            check_fields(save_options, ('SaveOption',))
+            parts.append(u'<ns0:SaveOptions>')
+            for save_option in items(save_options.get('SaveOption') or []):
+                check_fields(save_option, ('PropertyName', 'SaveAction'))
+                parts.append(u'<ns0:SaveOption><ns0:PropertyName>{0}</ns0:PropertyName>'
+                             u'<ns0:SaveAction>{1}</ns0:SaveAction></ns0:SaveOption>'.format(
+                                 text(save_option['PropertyName']), text(save_option['SaveAction'])))
+            parts.append(u'</ns0:SaveOptions>')
+        if options.get('RequestType') is not None:
+            parts.append(u'<ns0:RequestType>{0}</ns0:RequestType>'.format(text(options['RequestType'])))
+        parts.append(u'</ns0:Options>')
@@ -0,0 +1,93 @@
+import threading
+from new import instance
+
+from suds.sudsobject import Metadata, Object, footprint
+
+
+def clone(value, skip=()):
+    '''
+    deep copy of a suds object built by the factory. Nested objects and lists are copied so the clone
+    can be changed without touching the original, the schema types in the metadata are shared.
+    Keys in skip are set to None instead of being copied.
+    '''
+    if isinstance(value, list):
+        return [clone(item) if isinstance(item, (Object, list)) else item for item in value]
+    if not isinstance(value, Object):
+        return value
+
+    copy = instance(value.__class__)
+    source = value.__dict__
+    target = copy.__dict__
+    target.update(source)
+    target['__keylist__'] = list(source['__keylist__'])
+
+    metadata = instance(Metadata)
+    metadata.__dict__.update(source['__metadata__'].__dict__)
+    metadata.__dict__['__keylist__'] = list(metadata.__dict__['__keylist__'])
+    target['__metadata__'] = metadata
+
+    for key in source['__keylist__']:
+        if key in skip:
+            target[key] = None
+        elif isinstance(target.get(key), (Object, list)):
+            target[key] = clone(target[key])
+    return copy
+
+
+def sparse(value):
+    '''
+    copy of a factory object with its optional nested objects that are still empty set to None. suds
+    leaves an optional element out of the request whether it is None or empty, so the copy marshals
+    the same while being far cheaper to clone.
+    '''
+    optional = set(child.name for child, ancestry in value.__metadata__.sxtype.children()
+                   if child.optional() or any(a.optional() for a in ancestry))
+    copy = clone(value)
+    for key in copy.__keylist__:
+        if key in optional and isinstance(copy[key], Object) and footprint(copy[key]) == 0:
+            copy[key] = None
+    return copy
+
+
+class ETObjectFactory(object):
+    '''
+    suds factory.create() walks the schema on every call, which takes from milliseconds to seconds
+    for types with deep trees such as TriggeredSend. This builds each type once per client and hands
+    out clones of that prototype.
+    '''
+
+    def __init__(self, soap_client):
+        self.factory = soap_client.factory
+        self.prototypes = {}
+        self.sparse_prototypes = {}
+        self.lock = threading.Lock()
+
+    def create(self, type_name):
+        '''
+        a new object of type_name, the same as factory.create() would build
+        '''
+        return clone(self.prototype(type_name))
+
+    def create_for_props(self, type_name, props):
+        '''
+        a new object of type_name to have props set on it and be sent. The keys of props are left as None
+        and optional nested objects as None rather than empty copies, see sparse()
+        '''
+        prototype = self.sparse_prototypes.get(type_name)
+        if prototype is None:
+            prototype = self.prototype(type_name)
+            with self.lock:
+                if type_name not in self.sparse_prototypes:
+                    self.sparse_prototypes[type_name] = sparse(prototype)
+                prototype = self.sparse_prototypes[type_name]
+        return clone(prototype, props)
+
+    def prototype(self, type_name):
+        prototype = self.prototypes.get(type_name)
+        if prototype is None:
+            # build under the lock so threads that ask for the same new type wait for one build
+            with self.lock:
+                if type_name not in self.prototypes:
+                    self.prototypes[type_name] = self.factory.create(type_name)
+                prototype = self.prototypes[type_name]
+        return prototype
@@ -1,5 +1,8 @@
-from .rest import ETCUDSupport, ETCUDSupportRest, ETGetSupport, ETGet, ETPatch, ETPost, ETDelete, ETConfigure, \
-    ETCreateOptions
+from itertools import izip
+
+from .envelope import ETEncodedRow
+from .rest import ETCUDSupport, ETCUDSupportRest, ETGetSupport, ETEventGetSupport, ETGet, ETPatch, ETPost, ETDelete, \
+    ETConfigure, ETCreateOptions
 from .utility import prune_dict
 
 
@@ -188,7 +191,7 @@ class ETProfileAttribute(ETCUDSupport):
         return obj
 
 
-class ETBounceEvent(ETGetSupport):
+class ETBounceEvent(ETEventGetSupport):
     '''
     wrap an Exact Target Bounce Event
     '''
@@ -224,7 +227,7 @@ class ETCampaignAsset(ETCUDSupportRest):
         self.url_props_required = ['id']
 
 
-class ETClickEvent(ETGetSupport):
+class ETClickEvent(ETEventGetSupport):
     '''
     wrap an Exact Target Click Event
     '''
@@ -249,19 +252,19 @@ class ETListSubscriber(ETGetSupport):
         self.obj_type = 'ListSubscriber'
 
 
-class ETSentEvent(ETGetSupport):
+class ETSentEvent(ETEventGetSupport):
     def __init__(self):
         super(ETSentEvent, self).__init__()
         self.obj_type = 'SentEvent'
 
 
-class ETOpenEvent(ETGetSupport):
+class ETOpenEvent(ETEventGetSupport):
     def __init__(self):
         super(ETOpenEvent, self).__init__()
         self.obj_type = 'OpenEvent'
 
 
-class ETUnsubEvent(ETGetSupport):
+class ETUnsubEvent(ETEventGetSupport):
     def __init__(self):
         super(ETUnsubEvent, self).__init__()
         self.obj_type = 'UnsubEvent'
@@ -275,13 +278,22 @@ class ETEmail(ETCUDSupport):
 
 class ETTriggeredSend(ETCUDSupport):
     subscribers = None
+    outbox = None
 
     def __init__(self):
         super(ETTriggeredSend, self).__init__()
         self.obj_type = 'TriggeredSendDefinition'
         self.attributes = None
 
-    def send(self, scheduled_time=None):
+    def send(self, scheduled_time=None, idempotency_key=None):
+        '''
+        with an ETTriggeredSendOutbox set as outbox, only queue the send there and return its idempotency key
+        '''
+        if self.outbox is not None:
+            if scheduled_time is not None:
+                raise Exception('Unable to schedule a TriggeredSend that goes through an outbox')
+            return self.outbox.add(self.props, self.subscribers, self.attributes, idempotency_key)
+
         create_options = None
         if scheduled_time is not None:
             create_options = ETCreateOptions(scheduled_time=scheduled_time).build()
@@ -329,12 +341,12 @@ class ETDataExtension(ETCUDSupport):
         self.props = original_props
         return obj
 
-    def patch(self):
+    def patch(self, update_options=None):
         self.props['Fields'] = {}
         self.props['Fields']['Field'] = []
         for key in self.columns:
             self.props['Fields']['Field'].append(key)
-        obj = super(ETDataExtension, self).patch()
+        obj = super(ETDataExtension, self).patch(update_options=update_options)
         del self.props['Fields']
         return obj
 
@@ -383,9 +395,41 @@ class ETDataExtensionColumn(ETGetSupport):
         return obj
 
 
+class ETDataExtensionRowEncoder(object):
+    '''
+    Builds the DataExtensionObjects for rows of one DataExtension, as ETEncodedRow. columns is fixed up
+    front so rows can be plain tuples of values in that order, which saves building a dict per row. keys=True
+    builds the Keys used by Delete instead of Properties.
+    '''
+
+    def __init__(self, customer_key, columns=None, keys=False):
+        self.customer_key = customer_key
+        self.columns = tuple(columns) if columns is not None else None
+        self.container, self.field = ('Keys', 'Key') if keys else ('Properties', 'Property')
+
+    def encode(self, row):
+        if len(row) != len(self.columns):
+            raise Exception('Unable to encode a row of {0} values for the {1} columns of DataExtension {2}'.format(
+                len(row), len(self.columns), self.customer_key))
+        return ETEncodedRow(self, self.columns, row)
+
+    def encode_dict(self, row):
+        return ETEncodedRow(self, row.keys(), row.values())
+
+
+def column_rows(data):
+    '''
+    split a dict of column name -> list of values into (columns, rows of tuples) for
+    ETDataExtensionRow.columns or ETDataExtensionRowWriter
+    '''
+    columns = data.keys()
+    return columns, izip(*[data[column] for column in columns])
+
+
 class ETDataExtensionRow(ETCUDSupport):
     name = None
     customer_key = None
+    columns = None
 
     def __init__(self):
         super(ETDataExtensionRow, self).__init__()
@@ -415,115 +459,43 @@ class ETDataExtensionRow(ETCUDSupport):
 
     def post(self, create_options=None):
         self.get_customer_key()
-        original_props = self.props
-
-        if type(self.props) is list:
-            current_prop_list = []
-            for rec in self.props:
-                current_fields = []
-                current_prop = {}
-
-                for key, value in rec.iteritems():
-                    current_fields.append({'Name' : key, 'Value' : value})
-
-                current_prop['CustomerKey'] = self.customer_key
-                current_prop['Properties'] = {}
-                current_prop['Properties']['Property'] = current_fields
-
-                current_prop_list.append(current_prop)
-
-            current_prop = current_prop_list
-
-        else:
-            current_fields = []
-            current_prop = {}
-
-            for key, value in self.props.iteritems():
-                current_fields.append({'Name' : key, 'Value' : value})
-
-            current_prop['CustomerKey'] = self.customer_key
-            current_prop['Properties'] = {}
-            current_prop['Properties']['Property'] = current_fields
-
-        obj = ETPost(self.auth_stub, self.obj_type, current_prop, create_options=create_options)
-        self.props = original_props
+        obj = ETPost(self.auth_stub, self.obj_type, self.encode_props(), create_options=create_options)
         return obj
 
-    def patch(self):
+    def patch(self, update_options=None):
         self.get_customer_key()
-
-        if type(self.props) is list:
-            current_prop_list = []
-            for rec in self.props:
-                current_fields = []
-                current_prop = {}
-
-                for key, value in rec.iteritems():
-                    current_fields.append({'Name' : key, 'Value' : value})
-
-                current_prop['CustomerKey'] = self.customer_key
-                current_prop['Properties'] = {}
-                current_prop['Properties']['Property'] = current_fields
-
-                current_prop_list.append(current_prop)
-
-            current_prop = current_prop_list
-        else:
-            current_fields = []
-            current_prop = {}
-
-            for key, value in self.props.iteritems():
-                current_fields.append({'Name' : key, 'Value' : value})
-
-            current_prop['CustomerKey'] = self.customer_key
-            current_prop['Properties'] = {}
-            current_prop['Properties']['Property'] = current_fields
-
-        obj = ETPatch(self.auth_stub, self.obj_type, current_prop)
+        obj = ETPatch(self.auth_stub, self.obj_type, self.encode_props(), update_options=update_options)
         return obj
 
     def delete(self):
         self.get_customer_key()
+        obj = ETDelete(self.auth_stub, self.obj_type, self.encode_props(keys=True))
+        return obj
 
-        if type(self.props) is list:
-            current_prop_list = []
-            for rec in self.props:
-                current_fields = []
-                current_prop = {}
-
-                for key, value in rec.iteritems():
-                    current_fields.append({'Name' : key, 'Value' : value})
-
-                current_prop['CustomerKey'] = self.customer_key
-                current_prop['Keys'] = {}
-                current_prop['Keys']['Key'] = current_fields
-
-                current_prop_list.append(current_prop)
-
-            current_prop = current_prop_list
+    def encode_props(self, keys=False):
+        '''
+        props as DataExtensionObject properties: a dict is one row, a list is many rows. With columns
+        set, each row is a tuple of values in that column order instead of a dict.
+        '''
+        encoder = ETDataExtensionRowEncoder(self.customer_key, self.columns, keys)
+        if self.columns is not None:
+            return [encoder.encode(row) for row in self.props]
+        elif type(self.props) is list:
+            return [encoder.encode_dict(row) for row in self.props]
         else:
-            current_fields = []
-            current_prop = {}
-
-            for key, value in self.props.iteritems():
-                current_fields.append({'Name' : key, 'Value' : value})
-
-            current_prop['CustomerKey'] = self.customer_key
-            current_prop['Keys'] = {}
-            current_prop['Keys']['Key'] = current_fields
-
-        obj = ETDelete(self.auth_stub, self.obj_type, current_prop)
-        return obj
+            return encoder.encode_dict(self.props)
 
     def get_customer_key(self):
         if self.customer_key is None:
             if self.name is None:
                 raise Exception('Unable to process DataExtension::Row request due to CustomerKey and Name not being defined on ET_DatExtension::row')
+            elif self.auth_stub.data_extension_keys is not None:
+                self.customer_key = self.auth_stub.data_extension_keys.customer_key(self.auth_stub, self.name)
             else:
                 de = ETDataExtension()
                 de.auth_stub = self.auth_stub
                 de.props = ['Name','CustomerKey']
-                de.search_filter = {'Property' : 'CustomerKey','SimpleOperator' : 'equals','Value' : self.name}
+                de.search_filter = {'Property' : 'Name','SimpleOperator' : 'equals','Value' : self.name}
                 get_response = de.get()
                 if get_response.status and len(get_response.results) == 1 and 'CustomerKey' in get_response.results[0]:
                     self.customer_key = get_response.results[0]['CustomerKey']
@@ -534,6 +506,8 @@ class ETDataExtensionRow(ETCUDSupport):
         if self.name is None:
             if self.customer_key is None:
                 raise Exception('Unable to process DataExtension::Row request due to CustomerKey and Name not being defined on ET_DatExtension::row')
+            elif self.auth_stub.data_extension_keys is not None:
+                self.name = self.auth_stub.data_extension_keys.name(self.auth_stub, self.customer_key)
             else:
                 de = ETDataExtension()
                 de.auth_stub = self.auth_stub
@@ -1,8 +1,11 @@
-import requests
 import json
-import copy
 import logging
-from utility import prune_dict
+import time
+from utility import prune_dict, get_prop
+from concurrency import merge, prefetch as prefetch_iter
+from envelope import ETEncodedRow
+from resultset import ETResultSet
+from stream import ETRetrieveStream
 
 TIMEOUT = 600  # make the timeout 10 minutes
 
@@ -11,22 +14,88 @@ class ETCreateOptions(object):
     '''
     Only needed for async requests
     Async requests can be scheduled
-    Sync requests cannot be scheduled
+    Sync requests cannot be scheduled, so a scheduled_time makes the request Asynchronous
     '''
 
-    def __init__(self, scheduled_time=None):
+    def __init__(self, scheduled_time=None, asynchronous=False):
         super(ETCreateOptions, self).__init__()
         self.scheduled_time = scheduled_time
+        self.asynchronous = asynchronous
 
     def build(self):
         dictionary = {
-            'RequestType': 'Synchronous',  # Asynchronous
+            'RequestType': 'Asynchronous' if self.asynchronous or self.scheduled_time is not None else 'Synchronous',
             'ScheduledTime': self.scheduled_time
         }
         dictionary = prune_dict(dictionary=dictionary)
         return dictionary
 
 
+class ETUpdateOptions(ETCreateOptions):
+    '''
+    Same request type and scheduling for Update calls
+    '''
+
+
+class ETAsyncRequest(object):
+    '''
+    Handle on an Asynchronous Create/Update. The server queues the objects and answers straight away,
+    poll status() or wait() for it to process them, then read the outcome per object from results().
+    '''
+
+    # RequestID is only a filter, AsyncRequestResult has no such element
+    status_props = ['Status', 'CompleteDate', 'CallStatus', 'CallMessage']
+    result_props = ['RequestID', 'ConversationID', 'StatusCode', 'StatusMessage', 'OrdinalID', 'ErrorCode',
+                    'RequestType', 'RequestObjectType']
+    finished_statuses = ('Complete', 'Error')
+
+    def __init__(self, auth_stub, response):
+        if not response.status:
+            raise Exception('Unable to submit asynchronous request code: {0} message: {1}'.format(response.code, response.message))
+        self.auth_stub = auth_stub
+        self.response = response
+        self.request_id = response.request_id
+
+    def status(self):
+        '''
+        the AsyncRequestResult Status (such as Queued, InProcess, Complete or Error), None until the server lists the request
+        '''
+        get_response = ETGet(self.auth_stub, 'AsyncRequestResult', self.status_props,
+                             {'Property': 'RequestID', 'SimpleOperator': 'equals', 'Value': self.request_id})
+        if not get_response.status:
+            raise Exception('Unable to retrieve AsyncRequestResult code: {0} message: {1}'.format(get_response.code, get_response.message))
+        if not get_response.results:
+            return None
+        return get_prop(get_response.results[0], 'Status')
+
+    def done(self):
+        return self.status() in self.finished_statuses
+
+    def wait(self, timeout=None, interval=10):
+        '''
+        poll every interval seconds until the request is processed and return its final status
+        '''
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            status = self.status()
+            if status in self.finished_statuses:
+                return status
+            if deadline is not None and time.time() + interval > deadline:
+                raise Exception('Timed out after {0} seconds waiting for asynchronous request {1}'.format(timeout, self.request_id))
+            time.sleep(interval)
+
+    def results(self):
+        '''
+        the ResultItem for each object of the request, across all pages
+        '''
+        items = ETGetSupport()
+        items.auth_stub = self.auth_stub
+        items.obj_type = 'ResultItem'
+        items.props = self.result_props
+        items.search_filter = {'Property': 'RequestID', 'SimpleOperator': 'equals', 'Value': self.request_id}
+        return items.iter_results()
+
+
 class ETConstructor(object):
     '''
     Parent class used to determine what status we are in depending on web service call results
@@ -99,15 +168,19 @@ class ETConstructor(object):
         return ws_object
 
     def parse_props_into_ws_object(self, auth_stub, obj_type, props):
-        empty_obj = auth_stub.soap_client.factory.create(obj_type)
+        if type(props) is ETEncodedRow:
+            props = props.as_props()
+        elif type(props) is list:
+            props = [prop_dict.as_props() if type(prop_dict) is ETEncodedRow else prop_dict for prop_dict in props]
+
         if props is not None and type(props) is dict:
-            ws_create = copy.copy(empty_obj)
+            ws_create = auth_stub.soap_factory.create_for_props(obj_type, props)
             ws_create = self.parse_props_dict_into_ws_object(obj_type, ws_create, props)
             return ws_create
         elif props is not None and type(props) is list:
             ws_create_list = []
             for prop_dict in props:
-                ws_create = copy.copy(empty_obj)
+                ws_create = auth_stub.soap_factory.create_for_props(obj_type, prop_dict)
                 ws_create = self.parse_props_dict_into_ws_object(obj_type, ws_create, prop_dict)
                 ws_create_list.append(ws_create)
 
@@ -116,6 +189,15 @@ class ETConstructor(object):
             message = 'Can not post properties to {0} without a dict or list of properties'.format(obj_type)
             raise Exception(message)
 
+    def build_envelope(self, auth_stub, method, obj_type, props, options=None):
+        '''
+        the call as a finished SOAP envelope when the client writes obj_type directly, None to go through suds
+        '''
+        envelope = auth_stub.data_extension_envelope
+        if envelope is None or obj_type != envelope.obj_type:
+            return None
+        return envelope.build(method, props, options)
+
 
 class ETDescribe(ETConstructor):
     '''
@@ -125,7 +207,7 @@ class ETDescribe(ETConstructor):
     def __init__(self, auth_stub, obj_type):
         auth_stub.refresh_token()
 
-        ws_describe_request = auth_stub.soap_client.factory.create('ArrayOfObjectDefinitionRequest')
+        ws_describe_request = auth_stub.soap_factory.create('ArrayOfObjectDefinitionRequest')
 
         object_definition_request = {'ObjectType': obj_type}
         ws_describe_request.ObjectDefinitionRequest = [object_definition_request]
@@ -145,7 +227,7 @@ class ETConfigure(ETConstructor):
     def __init__(self, auth_stub, obj_type, props=None, update=False, delete=False):
         auth_stub.refresh_token()
 
-        ws_configure_request = auth_stub.soap_client.factory.create('ConfigureRequestMsg')
+        ws_configure_request = auth_stub.soap_factory.create('ConfigureRequestMsg')
         action = 'create'
         if delete:
             action = 'delete'
@@ -160,76 +242,86 @@ class ETConfigure(ETConstructor):
             super(ETConfigure, self).__init__(response)
 
 
-class ETGet(ETConstructor):
+def build_retrieve_request(auth_stub, obj_type, props=None, search_filter=None, options=None, client_ids=[], query_all_accounts=False):
     '''
-    Get call to a web service
+    RetrieveRequest for ETGet and ETRetrieveStream
     '''
-
-    def __init__(self, auth_stub, obj_type, props=None, search_filter=None, options=None, client_ids=[], query_all_accounts=False):
-        auth_stub.refresh_token()
-
-        if props is None:  # if there are no properties to retrieve for the obj_type then return a Description of obj_type
+    if props is None:  # if there are no properties to retrieve for the obj_type then return a Description of obj_type
+        if auth_stub.describe_cache is not None:
+            props = auth_stub.describe_cache.retrievable_props(auth_stub, obj_type)
+        else:
             describe = ETDescribe(auth_stub, obj_type)
             props = []
             for prop in describe.results[0].Properties:
                 if prop.IsRetrievable:
                     props.append(prop.Name)
 
-        ws_retrieve_request = auth_stub.soap_client.factory.create('RetrieveRequest')
-        ws_retrieve_request.QueryAllAccounts = query_all_accounts
+    ws_retrieve_request = auth_stub.soap_factory.create('RetrieveRequest')
+    ws_retrieve_request.QueryAllAccounts = query_all_accounts
 
-        if client_ids:
-            formatted_client_ids = []
-            for client_id in client_ids:
-                formatted_client_ids.append({'CustomerKey': client_id})
-                ws_retrieve_request.ClientIDs = formatted_client_ids
+    if client_ids:
+        formatted_client_ids = []
+        for client_id in client_ids:
+            formatted_client_ids.append({'CustomerKey': client_id})
+            ws_retrieve_request.ClientIDs = formatted_client_ids
 
-        if props is not None:
-            if type(props) is dict:  # If the properties is a hash, then we just want to use the keys
-                ws_retrieve_request.Properties = props.keys()
-            else:
-                ws_retrieve_request.Properties = props
-
-        if search_filter is not None:
-            if 'LogicalOperator' in search_filter:
-                ws_simple_filter_part_left = auth_stub.soap_client.factory.create('SimpleFilterPart')
-                for prop in ws_simple_filter_part_left:
-                    if prop[0] in search_filter['LeftOperand']:
-                        ws_simple_filter_part_left[prop[0]] = search_filter['LeftOperand'][prop[0]]
-
-                ws_simple_filter_part_right = auth_stub.soap_client.factory.create('SimpleFilterPart')
-                for prop in ws_simple_filter_part_right:
-                    if prop[0] in search_filter['RightOperand']:
-                        ws_simple_filter_part_right[prop[0]] = search_filter['RightOperand'][prop[0]]
-
-                ws_complex_filter_part = auth_stub.soap_client.factory.create('ComplexFilterPart')
-                ws_complex_filter_part.LeftOperand = ws_simple_filter_part_left
-                ws_complex_filter_part.RightOperand = ws_simple_filter_part_right
-                ws_complex_filter_part.LogicalOperator = search_filter['LogicalOperator']
-                for additional_operand in search_filter.get('AdditionalOperands', []):
-                    ws_simple_filter_part = auth_stub.soap_client.factory.create('SimpleFilterPart')
-                    for k, v in additional_operand.items():
-                        ws_simple_filter_part[k] = v
-                    ws_complex_filter_part.AdditionalOperands.Operand.append(ws_simple_filter_part)
-
-                ws_retrieve_request.Filter = ws_complex_filter_part
+    if props is not None:
+        if type(props) is dict:  # If the properties is a hash, then we just want to use the keys
+            ws_retrieve_request.Properties = props.keys()
+        else:
+            ws_retrieve_request.Properties = props
+
+    if search_filter is not None:
+        if 'LogicalOperator' in search_filter:
+            ws_simple_filter_part_left = auth_stub.soap_factory.create('SimpleFilterPart')
+            for prop in ws_simple_filter_part_left:
+                if prop[0] in search_filter['LeftOperand']:
+                    ws_simple_filter_part_left[prop[0]] = search_filter['LeftOperand'][prop[0]]
+
+            ws_simple_filter_part_right = auth_stub.soap_factory.create('SimpleFilterPart')
+            for prop in ws_simple_filter_part_right:
+                if prop[0] in search_filter['RightOperand']:
+                    ws_simple_filter_part_right[prop[0]] = search_filter['RightOperand'][prop[0]]
+
+            ws_complex_filter_part = auth_stub.soap_factory.create('ComplexFilterPart')
+            ws_complex_filter_part.LeftOperand = ws_simple_filter_part_left
+            ws_complex_filter_part.RightOperand = ws_simple_filter_part_right
+            ws_complex_filter_part.LogicalOperator = search_filter['LogicalOperator']
+            for additional_operand in search_filter.get('AdditionalOperands', []):
+                ws_simple_filter_part = auth_stub.soap_factory.create('SimpleFilterPart')
+                for k, v in additional_operand.items():
+                    ws_simple_filter_part[k] = v
+                ws_complex_filter_part.AdditionalOperands.Operand.append(ws_simple_filter_part)
+
+            ws_retrieve_request.Filter = ws_complex_filter_part
+        else:
+            ws_simple_filter_part = auth_stub.soap_factory.create('SimpleFilterPart')
+            for prop in ws_simple_filter_part:
+                if prop[0] in search_filter:
+                    ws_simple_filter_part[prop[0]] = search_filter[prop[0]]
+            ws_retrieve_request.Filter = ws_simple_filter_part
+
+    if options is not None:
+        for key, value in options.iteritems():
+            if isinstance(value, dict):
+                for k, v in value.iteritems():
+                    ws_retrieve_request.Options[key][k] = v
             else:
-                ws_simple_filter_part = auth_stub.soap_client.factory.create('SimpleFilterPart')
-                for prop in ws_simple_filter_part:
-                    if prop[0] in search_filter:
-                        ws_simple_filter_part[prop[0]] = search_filter[prop[0]]
-                ws_retrieve_request.Filter = ws_simple_filter_part
-
-        if options is not None:
-            for key, value in options.iteritems():
-                if isinstance(value, dict):
-                    for k, v in value.iteritems():
-                        ws_retrieve_request.Options[key][k] = v
-                else:
-                    ws_retrieve_request.Options[key] = value
+                ws_retrieve_request.Options[key] = value
 
-        ws_retrieve_request.ObjectType = obj_type
+    ws_retrieve_request.ObjectType = obj_type
+    return ws_retrieve_request
 
+
+class ETGet(ETConstructor):
+    '''
+    Get call to a web service
+    '''
+
+    def __init__(self, auth_stub, obj_type, props=None, search_filter=None, options=None, client_ids=[], query_all_accounts=False):
+        auth_stub.refresh_token()
+
+        ws_retrieve_request = build_retrieve_request(auth_stub, obj_type, props, search_filter, options, client_ids, query_all_accounts)
         response = auth_stub.soap_client.service.Retrieve(ws_retrieve_request)
 
         if response is not None:
@@ -244,16 +336,20 @@ class ETPost(ETConstructor):
     def __init__(self, auth_stub, obj_type, props=None, create_options=None):
         auth_stub.refresh_token()
 
-        if create_options is not None:
-            empty_obj = auth_stub.soap_client.factory.create('CreateOptions')
-            create_options = self.parse_props_dict_into_ws_object(
-                obj_type='CreateOptions',
-                ws_object=empty_obj,
-                props_dict=create_options
-            )
+        envelope = self.build_envelope(auth_stub, 'Create', obj_type, props, create_options)
+        if envelope is not None:
+            response = auth_stub.data_extension_envelope.send('Create', envelope)
+        else:
+            if create_options is not None:
+                empty_obj = auth_stub.soap_factory.create('CreateOptions')
+                create_options = self.parse_props_dict_into_ws_object(
+                    obj_type='CreateOptions',
+                    ws_object=empty_obj,
+                    props_dict=create_options
+                )
 
-        obj = self.parse_props_into_ws_object(auth_stub, obj_type, props)
-        response = auth_stub.soap_client.service.Create(create_options, obj)
+            obj = self.parse_props_into_ws_object(auth_stub, obj_type, props)
+            response = auth_stub.soap_client.service.Create(create_options, obj)
 
         if response is not None:
             super(ETPost, self).__init__(response)
@@ -264,10 +360,22 @@ class ETPatch(ETConstructor):
     Call the Exact Target web service Update method
     '''
 
-    def __init__(self, auth_stub, obj_type, props=None):
+    def __init__(self, auth_stub, obj_type, props=None, update_options=None):
         auth_stub.refresh_token()
 
-        response = auth_stub.soap_client.service.Update(None, self.parse_props_into_ws_object(auth_stub, obj_type, props))
+        envelope = self.build_envelope(auth_stub, 'Update', obj_type, props, update_options)
+        if envelope is not None:
+            response = auth_stub.data_extension_envelope.send('Update', envelope)
+        else:
+            if update_options is not None:
+                empty_obj = auth_stub.soap_factory.create('UpdateOptions')
+                update_options = self.parse_props_dict_into_ws_object(
+                    obj_type='UpdateOptions',
+                    ws_object=empty_obj,
+                    props_dict=update_options
+                )
+
+            response = auth_stub.soap_client.service.Update(update_options, self.parse_props_into_ws_object(auth_stub, obj_type, props))
 
         if response is not None:
             super(ETPatch, self).__init__(response)
@@ -281,7 +389,11 @@ class ETDelete(ETConstructor):
     def __init__(self, auth_stub, obj_type, props=None):
         auth_stub.refresh_token()
 
-        response = auth_stub.soap_client.service.Delete(None, self.parse_props_into_ws_object(auth_stub, obj_type, props))
+        envelope = self.build_envelope(auth_stub, 'Delete', obj_type, props)
+        if envelope is not None:
+            response = auth_stub.data_extension_envelope.send('Delete', envelope)
+        else:
+            response = auth_stub.soap_client.service.Delete(None, self.parse_props_into_ws_object(auth_stub, obj_type, props))
 
         if response is not None:
             super(ETDelete, self).__init__(response)
@@ -295,7 +407,7 @@ class ETContinue(ETConstructor):
     def __init__(self, auth_stub, request_id):
         auth_stub.refresh_token()
 
-        ws_continue_request = auth_stub.soap_client.factory.create('RetrieveRequest')
+        ws_continue_request = auth_stub.soap_factory.create('RetrieveRequest')
         ws_continue_request.ContinueRequest = request_id
         response = auth_stub.soap_client.service.Retrieve(ws_continue_request)
 
@@ -326,6 +438,25 @@ class ETGetSupport(ETBaseObject):
     obj_type = 'ET_GetSupport'   # should be overwritten by inherited class
 
     def get(self, m_props=None, m_filter=None, m_options=None, client_ids=[], query_all_accounts=False):
+        props, search_filter, options = self.get_args(m_props, m_filter, m_options)
+
+        obj = ETGet(
+            self.auth_stub,
+            self.obj_type, props,
+            search_filter,
+            options,
+            client_ids=client_ids,
+            query_all_accounts=query_all_accounts
+        )
+
+        if obj is not None:
+            self.last_request_id = obj.request_id
+        return obj
+
+    def get_args(self, m_props, m_filter, m_options):
+        '''
+        (props, search_filter, options) of a get, the m_ arguments override the object's own
+        '''
         props = self.props
         search_filter = self.search_filter
         options = self.options
@@ -341,21 +472,13 @@ class ETGetSupport(ETBaseObject):
         if m_options is not None and type(m_filter) is dict:
             options = m_options
 
-        obj = ETGet(
-            self.auth_stub,
-            self.obj_type, props,
-            search_filter,
-            options,
-            client_ids=client_ids,
-            query_all_accounts=query_all_accounts
-        )
-
-        if obj is not None:
-            self.last_request_id = obj.request_id
-        return obj
+        return props, search_filter, options
 
     def info(self):
-        obj = ETDescribe(self.auth_stub, self.obj_type)
+        if self.auth_stub.describe_cache is not None:
+            obj = self.auth_stub.describe_cache.describe(self.auth_stub, self.obj_type)
+        else:
+            obj = ETDescribe(self.auth_stub, self.obj_type)
         if obj is not None:
             self.last_request_id = obj.request_id
         return obj
@@ -366,6 +489,142 @@ class ETGetSupport(ETBaseObject):
             self.last_request_id = obj.request_id
         return obj
 
+    def iter_pages(self, m_props=None, m_filter=None, m_options=None, client_ids=[], query_all_accounts=False, prefetch=0):
+        '''
+        generator over the get() response followed by every get_more_results() page,
+        only the page being consumed is kept in memory
+
+        prefetch - number of pages to fetch ahead on a background thread while the caller works on the
+                   current one, pages then come from ETContinue calls on that thread using each page's request_id
+        '''
+        pages = self.fetch_pages(m_props, m_filter, m_options, client_ids, query_all_accounts)
+        if prefetch > 0:
+            pages = prefetch_iter(pages, prefetch)
+        return pages
+
+    def fetch_pages(self, m_props, m_filter, m_options, client_ids, query_all_accounts):
+        obj = self.get(m_props, m_filter, m_options, client_ids=client_ids, query_all_accounts=query_all_accounts)
+        while True:
+            yield obj
+            more_results = obj.more_results
+            request_id = obj.request_id
+            obj = None  # let the consumed page go before fetching the next one
+            if not more_results:
+                return
+            obj = ETContinue(self.auth_stub, request_id)
+            self.last_request_id = obj.request_id
+
+    def iter_results(self, m_props=None, m_filter=None, m_options=None, client_ids=[], query_all_accounts=False, prefetch=0):
+        '''
+        generator over the rows of every page, see iter_pages()
+        '''
+        pages = self.iter_pages(m_props, m_filter, m_options, client_ids=client_ids,
+                                query_all_accounts=query_all_accounts, prefetch=prefetch)
+        for page in pages:
+            if not page.status:
+                raise Exception('Unable to retrieve {0} code: {1} message: {2}'.format(self.obj_type, page.code, page.message))
+            for row in page.results:
+                yield row
+
+    def iter_rows(self, m_props=None, m_filter=None, m_options=None, client_ids=[], query_all_accounts=False, tuples=False):
+        '''
+        generator over the rows of every page like iter_results(), but each page is parsed as it is read
+        (see ETRetrieveStream) rather than unmarshalled by suds, so only the row being consumed is held in
+        memory. Rows are plain dicts, or with tuples=True tuples of the retrieved properties in props order.
+        '''
+        pages = self.iter_stream_pages(m_props, m_filter, m_options, client_ids=client_ids,
+                                       query_all_accounts=query_all_accounts, tuples=tuples)
+        for page in pages:
+            for row in page:
+                yield row
+
+    def get_result_set(self, m_props=None, m_filter=None, m_options=None, client_ids=[], query_all_accounts=False):
+        '''
+        every row of every page in one ETResultSet, which stores them column by column
+        '''
+        result_set = None
+        pages = self.iter_stream_pages(m_props, m_filter, m_options, client_ids=client_ids,
+                                       query_all_accounts=query_all_accounts, tuples=True)
+        for page in pages:
+            if result_set is None:
+                result_set = ETResultSet(page.columns)
+            result_set.extend(page)
+        return result_set
+
+    def iter_stream_pages(self, m_props=None, m_filter=None, m_options=None, client_ids=[], query_all_accounts=False, tuples=False):
+        '''
+        generator over an ETRetrieveStream per page, each must be read before the next one is requested
+        '''
+        props, search_filter, options = self.get_args(m_props, m_filter, m_options)
+        self.auth_stub.refresh_token()
+        ws_retrieve_request = build_retrieve_request(self.auth_stub, self.obj_type, props, search_filter, options,
+                                                     client_ids, query_all_accounts)
+        columns = list(ws_retrieve_request.Properties) if tuples else None
+
+        while True:
+            page = ETRetrieveStream(self.auth_stub, ws_retrieve_request, columns)
+            try:
+                if not page.status:
+                    raise Exception('Unable to retrieve {0} code: {1} message: {2}'.format(self.obj_type, page.code, page.message))
+                self.last_request_id = page.request_id
+                yield page
+            finally:
+                page.close()
+            if not page.more_results:
+                return
+
+            self.auth_stub.refresh_token()
+            ws_retrieve_request = self.auth_stub.soap_factory.create('RetrieveRequest')
+            ws_retrieve_request.ContinueRequest = page.request_id
+
+
+class ETEventGetSupport(ETGetSupport):
+    '''
+    Tracking events, adds retrieving an EventDate range as several windows fetched concurrently
+    '''
+
+    date_property = 'EventDate'
+
+    def iter_partitioned_results(self, start_date, end_date, partitions=4, m_props=None, max_workers=None,
+                                 buffer_size=5000):
+        '''
+        generator over the events with start_date <= EventDate < end_date. The range is split into
+        partitions windows of equal length, each paged through on its own thread, and the rows are
+        yielded in arrival order (not date order). self.search_filter, if set, must be a simple
+        filter and is applied to every window.
+
+        Each window includes its start and not its end, so every event comes from exactly one window.
+        '''
+        props = m_props or self.props
+        if props is None:
+            raise Exception('Partitioned retrieve of {0} requires props'.format(self.obj_type))
+        if type(props) is dict:
+            props = props.keys()
+        if self.search_filter is not None and 'LogicalOperator' in self.search_filter:
+            raise Exception('Partitioned retrieve of {0} only supports a simple search_filter'.format(self.obj_type))
+
+        step = (end_date - start_date) / partitions
+        boundaries = [start_date + step * i for i in range(partitions)] + [end_date]
+        windows = [self.window_results(props, boundaries[i], boundaries[i + 1]) for i in range(partitions)]
+
+        for row in merge(windows, buffer_size=buffer_size, max_workers=max_workers):
+            yield row
+
+    def window_results(self, props, window_start, window_end):
+        window_filter = {
+            'LeftOperand': {'Property': self.date_property, 'SimpleOperator': 'greaterThanOrEqual', 'DateValue': window_start},
+            'LogicalOperator': 'AND',
+            'RightOperand': {'Property': self.date_property, 'SimpleOperator': 'lessThan', 'DateValue': window_end},
+        }
+        if self.search_filter is not None:
+            window_filter['AdditionalOperands'] = [self.search_filter]
+
+        # every window pages through its own continue cursor
+        window = self.__class__()
+        window.auth_stub = self.auth_stub
+        window.options = self.options
+        return window.iter_results(props, window_filter, self.options)
+
 
 class ETGetRest(ETConstructor):
     '''
@@ -374,11 +633,11 @@ class ETGetRest(ETConstructor):
 
     def __init__(self, auth_stub, endpoint, qs=None):
         auth_stub.refresh_token()
-        full_endpoint = '{0}?access_token={1}'.format(endpoint, auth_stub.authToken)
+        full_endpoint = '{0}?access_token={1}'.format(endpoint, auth_stub.auth_token)
         for qs_value in qs:
             full_endpoint = '{0}&{1}={2}'.format(full_endpoint, qs_value, str(qs[qs_value]))
 
-        r = requests.get(full_endpoint, timeout=TIMEOUT)
+        r = auth_stub.http_session.get(full_endpoint, timeout=TIMEOUT)
         self.more_results = False
         super(ETGetRest, self).__init__(r, True)
 
@@ -392,8 +651,8 @@ class ETPostRest(ETConstructor):
         auth_stub.refresh_token()
 
         headers = {'content-type': 'application/json'}
-        full_endpoint = '{0}?access_token={1}'.format(endpoint, auth_stub.authToken)
-        r = requests.post(full_endpoint, data=json.dumps(payload), headers=headers, timeout=TIMEOUT)
+        full_endpoint = '{0}?access_token={1}'.format(endpoint, auth_stub.auth_token)
+        r = auth_stub.http_session.post(full_endpoint, data=json.dumps(payload), headers=headers, timeout=TIMEOUT)
         super(ETPostRest, self).__init__(r, True)
 
 
@@ -406,8 +665,8 @@ class ETPatchRest(ETConstructor):
         auth_stub.refresh_token()
 
         headers = {'content-type': 'application/json'}
-        full_endpoint = '{0}?access_token={1}'.format(endpoint, auth_stub.authToken)
-        r = requests.patch(full_endpoint, data=json.dumps(payload), headers=headers, timeout=TIMEOUT)
+        full_endpoint = '{0}?access_token={1}'.format(endpoint, auth_stub.auth_token)
+        r = auth_stub.http_session.patch(full_endpoint, data=json.dumps(payload), headers=headers, timeout=TIMEOUT)
         super(ETPatchRest, self).__init__(r, True)
 
 
@@ -418,8 +677,8 @@ class ETDeleteRest(ETConstructor):
     def __init__(self, auth_stub, endpoint):
         auth_stub.refresh_token()
 
-        full_endpoint = '{0}?access_token={1}'.format(endpoint, auth_stub.authToken)
-        r = requests.delete(full_endpoint, timeout=TIMEOUT)
+        full_endpoint = '{0}?access_token={1}'.format(endpoint, auth_stub.auth_token)
+        r = auth_stub.http_session.delete(full_endpoint, timeout=TIMEOUT)
         super(ETDeleteRest, self).__init__(r, True)
 
 
@@ -433,17 +692,29 @@ class ETCUDSupport(ETGetSupport):
             for k, v in self.extProps.iteritems():
                 self.props[k.capitalize] = v
 
-        obj = ETPost(self.auth_stub, self.obj_type, self.props)
+        obj = ETPost(self.auth_stub, self.obj_type, self.props, create_options=create_options)
         if obj is not None:
             self.last_request_id = obj.request_id
         return obj
 
-    def patch(self):
-        obj = ETPatch(self.auth_stub, self.obj_type, self.props)
+    def patch(self, update_options=None):
+        obj = ETPatch(self.auth_stub, self.obj_type, self.props, update_options=update_options)
         if obj is not None:
             self.last_request_id = obj.request_id
         return obj
 
+    def post_async(self, scheduled_time=None):
+        '''
+        Create with RequestType Asynchronous, optionally at scheduled_time, returns an ETAsyncRequest
+        '''
+        return ETAsyncRequest(self.auth_stub, self.post(create_options=ETCreateOptions(scheduled_time, asynchronous=True).build()))
+
+    def patch_async(self, scheduled_time=None):
+        '''
+        Update with RequestType Asynchronous, optionally at scheduled_time, returns an ETAsyncRequest
+        '''
+        return ETAsyncRequest(self.auth_stub, self.patch(update_options=ETUpdateOptions(scheduled_time, asynchronous=True).build()))
+
     def delete(self):
         obj = ETDelete(self.auth_stub, self.obj_type, self.props)
         if obj is not None:
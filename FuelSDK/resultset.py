@@ -0,0 +1,306 @@
+from array import array
+from datetime import datetime, timedelta
+
+from .utility import get_prop
+
+# range of the native C long that array('l') holds
+INT_LIMIT = 2 ** (array('l').itemsize * 8 - 1)
+
+
+def is_int(value):
+    return isinstance(value, (int, long)) and not isinstance(value, bool) and -INT_LIMIT <= value < INT_LIMIT
+
+
+class ETCodeColumn(object):
+    '''
+    Values stored once each with a small integer code per row, so a column such as EventType or SendID
+    that repeats a handful of values costs one or two bytes a row. A column that turns out to be mostly
+    distinct values (a SubscriberKey), or that holds lists or dicts (repeating or complex properties
+    such as Attributes), falls back to a plain list.
+    '''
+
+    def __init__(self):
+        self.values = []
+        self.index = {}
+        self.codes = array('B')
+
+    def append(self, value):
+        if self.index is None:
+            self.values.append(value)
+            return
+        try:
+            code = self.index.get(value)
+        except TypeError:
+            # unhashable, can't be dictionary encoded
+            self.to_list()
+            self.values.append(value)
+            return
+        if code is None:
+            code = len(self.values)
+            if code == 256:
+                self.codes = array('H', self.codes)
+            elif code == 65536:
+                self.widen_codes()
+                if self.index is None:
+                    self.values.append(value)
+                    return
+            self.index[value] = code
+            self.values.append(value)
+        self.codes.append(code)
+
+    def widen_codes(self):
+        if len(self.codes) < len(self.values) * 2:
+            # mostly distinct values, a code per row only adds to the cost of storing them
+            self.to_list()
+        else:
+            self.codes = array('I', self.codes)
+
+    def to_list(self):
+        self.values = [self.values[code] for code in self.codes]
+        self.index = None
+        self.codes = None
+
+    def __getitem__(self, i):
+        if self.index is None:
+            return self.values[i]
+        return self.values[self.codes[i]]
+
+    def __len__(self):
+        return len(self.codes) if self.index is not None else len(self.values)
+
+
+class ETIntColumn(object):
+    '''
+    ints packed in an array, None kept as the set of rows that have it
+    '''
+
+    def __init__(self):
+        self.values = array('l')
+        self.nulls = set()
+
+    def accepts(self, value):
+        return value is None or is_int(value)
+
+    def append(self, value):
+        if value is None:
+            self.nulls.add(len(self.values))
+            value = 0
+        self.values.append(value)
+
+    def __getitem__(self, i):
+        if i in self.nulls:
+            return None
+        return self.values[i]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class ETDateColumn(object):
+    '''
+    naive datetimes packed as the day ordinal and the seconds into that day
+    '''
+
+    def __init__(self):
+        self.days = array('i')
+        self.seconds = array('d')
+        self.nulls = set()
+
+    def accepts(self, value):
+        return value is None or (isinstance(value, datetime) and value.tzinfo is None)
+
+    def append(self, value):
+        if value is None:
+            self.nulls.add(len(self.days))
+            self.days.append(1)
+            self.seconds.append(0)
+            return
+        self.days.append(value.toordinal())
+        self.seconds.append(value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6)
+
+    def __getitem__(self, i):
+        if i in self.nulls:
+            return None
+        return datetime.fromordinal(self.days[i]) + timedelta(microseconds=round(self.seconds[i] * 1e6))
+
+    def __len__(self):
+        return len(self.days)
+
+
+def column_for(value):
+    '''
+    the storage for a column whose first value (other than None) is value
+    '''
+    if is_int(value):
+        return ETIntColumn()
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return ETDateColumn()
+    return ETCodeColumn()
+
+
+class ETResultRow(object):
+    '''
+    One row of an ETResultSet, read like a suds result or dict: row['SendID'], row.SendID,
+    row['Client']['ID'], row.Client.ID or get_prop(row, 'Client.ID'). Values are read from the
+    columns on access, the row itself holds nothing but its position.
+    '''
+
+    __slots__ = ('result_set', 'position', 'prefix')
+
+    def __init__(self, result_set, position, prefix=''):
+        self.result_set = result_set
+        self.position = position
+        self.prefix = prefix
+
+    def __getitem__(self, name):
+        name = self.prefix + name
+        result_set = self.result_set
+        column = result_set.positions.get(name)
+        if column is not None:
+            return result_set.value(self.position, column)
+        if name + '.' in result_set.prefixes:
+            return ETResultRow(result_set, self.position, name + '.')
+        raise KeyError(name)
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __contains__(self, name):
+        name = self.prefix + name
+        return name in self.result_set.positions or name + '.' in self.result_set.prefixes
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def keys(self):
+        names = []
+        for name in self.result_set.names:
+            if name.startswith(self.prefix):
+                key = name[len(self.prefix):].split('.', 1)[0]
+                if key not in names:
+                    names.append(key)
+        return names
+
+    def as_dict(self):
+        '''
+        the row as nested dicts
+        '''
+        return dict((key, value.as_dict() if isinstance(value, ETResultRow) else value)
+                    for key, value in ((key, self[key]) for key in self.keys()))
+
+    def as_tuple(self):
+        return self.result_set.row_tuple(self.position)
+
+    def __repr__(self):
+        return repr(self.as_dict())
+
+
+class ETResultSet(object):
+    '''
+    Retrieve results held column by column rather than as a suds object per row. Each column picks its
+    storage from its first value: ints and dates are packed into arrays, anything else (strings,
+    booleans, enums) is stored once per distinct value with a small code per row. Lists and dicts,
+    from repeating or complex properties, are kept as they are in a plain list. A million SentEvent
+    rows take tens of megabytes instead of gigabytes.
+
+    names - the retrieved properties, dotted for nested ones (Client.ID), in the order of the row tuples
+
+    Indexing and iterating give ETResultRow views; tuples() and column() read the values directly.
+    '''
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self.positions = dict((name, i) for i, name in enumerate(self.names))
+        self.prefixes = set()
+        for name in self.names:
+            parts = name.split('.')
+            for i in range(1, len(parts)):
+                self.prefixes.add('.'.join(parts[:i]) + '.')
+        self.columns = [None] * len(self.names)
+        self.pending_nulls = [0] * len(self.names)  # None values seen before a column's type is known
+        self.count = 0
+
+    def append(self, row):
+        '''
+        add a row given as a tuple of values in names order
+        '''
+        for i, value in enumerate(row):
+            column = self.columns[i]
+            if column is None:
+                if value is None:
+                    self.pending_nulls[i] += 1
+                    continue
+                column = self.columns[i] = column_for(value)
+                for _ in xrange(self.pending_nulls[i]):
+                    column.append(None)
+            elif not isinstance(column, ETCodeColumn) and not column.accepts(value):
+                column = self.columns[i] = self.recode(column)
+            column.append(value)
+        self.count += 1
+
+    def append_result(self, result):
+        '''
+        add a suds result or dict, reading each of names from it with get_prop
+        '''
+        self.append([get_prop(result, name) for name in self.names])
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def extend_results(self, results):
+        for result in results:
+            self.append_result(result)
+
+    def recode(self, column):
+        '''
+        move a column to ETCodeColumn when a value of another type shows up
+        '''
+        recoded = ETCodeColumn()
+        for i in xrange(len(column)):
+            recoded.append(column[i])
+        return recoded
+
+    def value(self, position, column):
+        storage = self.columns[column]
+        if storage is None:
+            return None
+        return storage[position]
+
+    def column(self, name):
+        '''
+        every value of one property, as a list
+        '''
+        column = self.positions[name]
+        return [self.value(position, column) for position in xrange(self.count)]
+
+    def row_tuple(self, position):
+        if position < 0:
+            position += self.count
+        if not 0 <= position < self.count:
+            raise IndexError(position)
+        return tuple(self.value(position, column) for column in xrange(len(self.names)))
+
+    def tuples(self):
+        for position in xrange(self.count):
+            yield self.row_tuple(position)
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self.count
+        if not 0 <= position < self.count:
+            raise IndexError(position)
+        return ETResultRow(self, position)
+
+    def __iter__(self):
+        for position in xrange(self.count):
+            yield ETResultRow(self, position)
+
+    def __len__(self):
+        return self.count
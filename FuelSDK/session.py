@@ -0,0 +1,20 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def build_http_session(pool_connections=10, pool_maxsize=10, pool_block=False, keep_alive=True):
+    '''
+    requests.Session shared by all the REST and auth calls of one ETClient
+
+    pool_connections - number of hosts to keep a connection pool for
+    pool_maxsize - connections kept open per host
+    pool_block - wait for a free connection instead of opening one past pool_maxsize
+    keep_alive - reuse connections between calls
+    '''
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
@@ -0,0 +1,203 @@
+import logging
+import threading
+from xml.etree.cElementTree import iterparse
+
+from suds.client import SoapClient
+
+PARTNER_NS = 'http://exacttarget.com/wsdl/partnerAPI'
+XSI_TYPE = '{http://www.w3.org/2001/XMLSchema-instance}type'
+XSI_NIL = '{http://www.w3.org/2001/XMLSchema-instance}nil'
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def type_name(value):
+    return value.rsplit(':', 1)[-1]
+
+
+class ETResultDecoder(object):
+    '''
+    Turns a Results element into plain dicts, typed from the WSDL schema the same way suds types them:
+    ints, booleans and dates are converted, elements that may repeat are lists, nil elements are None.
+    Elements of a type the schema does not know are left as text.
+    '''
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def decode(self, elem):
+        xsi_type = elem.get(XSI_TYPE)
+        sxtype = self.schema.types.get((type_name(xsi_type), PARTNER_NS)) if xsi_type else None
+        return self.decode_complex(elem, sxtype)
+
+    def decode_complex(self, elem, sxtype):
+        row = {}
+        children = self.child_types(sxtype)
+        for child in elem:
+            name = local_name(child.tag)
+            child_type, multi = children.get(name, (None, False))
+            xsi_type = child.get(XSI_TYPE)
+            if xsi_type:
+                child_type = self.schema.types.get((type_name(xsi_type), PARTNER_NS), child_type)
+            value = self.decode_value(child, child_type)
+            if multi:
+                row.setdefault(name, []).append(value)
+            elif name in row:
+                if type(row[name]) is not list:
+                    row[name] = [row[name]]
+                row[name].append(value)
+            else:
+                row[name] = value
+        return row
+
+    def decode_value(self, elem, sxtype):
+        if elem.get(XSI_NIL) == 'true':
+            return None
+        if len(elem):
+            return self.decode_complex(elem, sxtype)
+        text = elem.text
+        if sxtype is not None and sxtype.builtin():
+            if not text:
+                return None if sxtype.name != 'string' else ''
+            return sxtype.translate(text)
+        if text is None and sxtype is not None and not sxtype.enum():
+            # an empty complex element
+            return None
+        return text or ''
+
+    def child_types(self, sxtype):
+        '''
+        {element name: (resolved schema type, whether it can repeat)} for the children of sxtype
+        '''
+        if sxtype is None:
+            return {}
+        children = self.children.get(sxtype)
+        if children is None:
+            children = dict((child.name, (child.resolve(), child.unbounded())) for child, _ in sxtype.children())
+            with self.lock:
+                self.children[sxtype] = children
+        return children
+
+
+class ETRetrieveStream(object):
+    '''
+    One Retrieve call whose reply is parsed while it is read off the connection instead of being
+    unmarshalled by suds in one piece. code, status, message, request_id and more_results are set like
+    on ETConstructor once the object is created; iterating it yields the rows of the page one at a time,
+    as dicts (see ETResultDecoder) or, when columns is given, as tuples of those dotted properties.
+    Each Results element is dropped once it has been decoded, so only one row is held in memory.
+
+    The page must be iterated to the end (or close() called) before the connection is reused.
+    '''
+
+    code = None
+    status = False
+    message = None
+    more_results = False
+    request_id = None
+
+    def __init__(self, auth_stub, retrieve_request, columns=None):
+        self.columns = tuple(columns) if columns is not None else None
+        self.decoder = auth_stub.result_decoder
+
+        soap_client = auth_stub.soap_client
+        method = soap_client.service.Retrieve.method
+        soap = SoapClient(soap_client, method)
+        envelope = method.binding.input.get_message(method, (retrieve_request,), {}).plain().encode('utf-8')
+        self.response = auth_stub.http_session.post(soap.location(), data=envelope, headers=soap.headers(), stream=True,
+                                                    timeout=(auth_stub.soap_connect_timeout, auth_stub.soap_read_timeout))
+        self.code = self.response.status_code
+        self.response.raw.decode_content = True
+        self.events = iterparse(self.response.raw, events=('start', 'end'))
+        self.container = None
+        self.depth = 0  # of the element being parsed below the RetrieveResponseMsg
+        self.finished = False
+        self.read_header()
+
+    def read_header(self):
+        '''
+        read up to the first Results element, which comes after OverallStatus and RequestID
+        '''
+        try:
+            self.read_until_results()
+        except SyntaxError:
+            # not a SOAP reply, such as an HTML error page from a proxy
+            if self.code == 200:
+                self.close()
+                raise
+            self.message = self.response.reason
+        if self.container is None:
+            self.close()
+
+    def read_until_results(self):
+        for event, elem in self.events:
+            tag = local_name(elem.tag)
+            if event == 'start':
+                if tag == 'RetrieveResponseMsg':
+                    self.container = elem
+                elif tag == 'Results' and self.container is not None:
+                    self.depth = 1
+                    return
+                continue
+            if tag == 'OverallStatus':
+                self.message = elem.text
+                self.status = self.code == 200 and self.message in ('OK', 'MoreDataAvailable')
+                self.more_results = self.message == 'MoreDataAvailable'
+            elif tag == 'RequestID':
+                self.request_id = elem.text
+            elif tag == 'faultstring':
+                self.message = elem.text
+            elif tag == 'RetrieveResponseMsg':
+                self.container = None
+                break
+        self.finish()
+
+    def __iter__(self):
+        if self.container is None:
+            return
+        try:
+            for event, elem in self.events:
+                if event == 'start':
+                    self.depth += 1
+                    continue
+                if elem is self.container:
+                    self.finish()
+                    break
+                self.depth -= 1
+                if self.depth == 0 and local_name(elem.tag) == 'Results':
+                    row = self.decoder.decode(elem)
+                    self.container.remove(elem)
+                    if self.columns is not None:
+                        row = tuple(self.column_value(row, column) for column in self.columns)
+                    yield row
+        finally:
+            self.close()
+
+    def column_value(self, row, column):
+        for name in column.split('.'):
+            if type(row) is not dict:
+                return None
+            row = row.get(name)
+        return row
+
+    def finish(self):
+        '''
+        read the rest of the reply so the connection can go back to the pool
+        '''
+        for _ in self.events:
+            pass
+        self.finished = True
+
+    def close(self):
+        self.container = None
+        try:
+            if not self.finished:
+                # a part read reply can't be reused
+                self.response.raw.close()
+            self.response.close()
+        except Exception:
+            logging.exception('Unable to close Retrieve response')
@@ -1,5 +1,8 @@
+from suds.bindings.multiref import MultiRef
 from suds.mx.appender import Appender, Content
 
+_multiref_process = MultiRef.process
+
 
 class _PropertyAppender(Appender):
     """
@@ -55,3 +58,15 @@ def _bodycontent(self, method, args, kwargs):
             p.setPrefix(ns[0], ns[1])
         root.append(p)
     return root
+
+
+def _process(self, body):
+    """
+    Process the specified soap envelope body and replace I{multiref} node
+    references with the contents of the referenced node.
+
+    Patched for FuelSDK: a binding keeps one MultiRef for every reply, and
+    process() keeps its state on it, so replies decoded on several threads at
+    once got mixed up. Each reply now gets a MultiRef of its own.
+    """
+    return _multiref_process(MultiRef(), body)
@@ -0,0 +1,160 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from .rest import ETContinue
+from .utility import get_prop, suds_to_dict
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def format_date(value):
+    return value.strftime(DATE_FORMAT) + '.{0:06d}'.format(value.microsecond)
+
+
+def parse_date(value):
+    return datetime.strptime(value, DATE_FORMAT + '.%f')
+
+
+def newest(a, b):
+    if a is None or (b is not None and b > a):
+        return b
+    return a
+
+
+class ETWatermarkStore(object):
+    '''
+    sqlite file holding the sync position of each event type: the EventDate everything up to has been
+    synced, and for a run in progress its continue RequestID plus the last page handed to the caller
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS watermarks ('
+                            'name TEXT PRIMARY KEY, event_date TEXT, pending_date TEXT, request_id TEXT, page TEXT)')
+
+    def load(self, name):
+        with self.lock:
+            row = self.db.execute('SELECT event_date, pending_date, request_id, page FROM watermarks WHERE name = ?',
+                                  (name,)).fetchone()
+        if row is None:
+            return {'event_date': None, 'pending_date': None, 'request_id': None, 'page': None}
+        return {
+            'event_date': parse_date(row[0]) if row[0] else None,
+            'pending_date': parse_date(row[1]) if row[1] else None,
+            'request_id': row[2],
+            'page': json.loads(row[3]) if row[3] else None,
+        }
+
+    def save(self, name, event_date, pending_date=None, request_id=None, page=None):
+        with self.lock, self.db:
+            self.db.execute('INSERT OR REPLACE INTO watermarks (name, event_date, pending_date, request_id, page) '
+                            'VALUES (?, ?, ?, ?, ?)',
+                            (name,
+                             format_date(event_date) if event_date else None,
+                             format_date(pending_date) if pending_date else None,
+                             request_id,
+                             json.dumps(page) if page is not None else None))
+
+    def reset(self, name):
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM watermarks WHERE name = ?', (name,))
+
+    def close(self):
+        self.db.close()
+
+
+class ETEventSync(object):
+    '''
+    Incremental pull of one tracking event type. Each run only retrieves events newer than the
+    stored watermark, and a run that dies part way resumes from its continue RequestID.
+
+    event - an ETSentEvent/ETOpenEvent/ETClickEvent/... with auth_stub and props set, props must include EventDate
+    store - ETWatermarkStore
+    name - watermark key, defaults to the event's obj_type
+    start_date - where the first run starts, everything is pulled when None
+    overlap - re-read this much before the watermark to pick up events that are recorded late
+
+    Rows are yielded as plain dicts (dates as ISO strings). Every page is written to the store before it
+    is handed out, so a page that was being processed when the run died is handed out again on resume:
+    delivery is at least once.
+    '''
+
+    def __init__(self, event, store, name=None, start_date=None, overlap=timedelta(0)):
+        self.event = event
+        self.store = store
+        self.name = name or event.obj_type
+        self.start_date = start_date
+        self.overlap = overlap
+
+    def iter_results(self):
+        if type(self.event.props) is list and 'EventDate' not in self.event.props:
+            raise Exception('Incremental sync of {0} requires EventDate in props'.format(self.name))
+
+        state = self.store.load(self.name)
+        event_date = state['event_date'] or self.start_date
+        pending_date = state['pending_date']
+
+        if state['page'] is not None:
+            # the previous run died while this page was being processed
+            for row in state['page']:
+                yield row
+
+        page = None
+        if state['request_id'] is not None:
+            page = ETContinue(self.event.auth_stub, state['request_id'])
+            if not page.status:
+                logging.log(level=logging.WARNING,
+                            msg='Unable to resume {0} sync from RequestID {1}, restarting from {2}'.format(
+                                self.name, state['request_id'], event_date))
+                page = None
+        elif state['page'] is not None:
+            # the dead run had already reached its last page
+            self.store.save(self.name, newest(event_date, pending_date))
+            return
+
+        if page is None:
+            pending_date = None
+            page = self.retrieve(event_date)
+
+        while True:
+            if not page.status:
+                raise Exception('Unable to sync {0} code: {1} message: {2}'.format(self.name, page.code, page.message))
+
+            rows = [suds_to_dict(row) for row in page.results]
+            for row in page.results:
+                row_date = get_prop(row, 'EventDate')
+                if row_date is not None and (pending_date is None or row_date > pending_date):
+                    pending_date = row_date
+
+            request_id = page.request_id if page.more_results else None
+            self.store.save(self.name, event_date, pending_date, request_id, rows)
+            more_results = page.more_results
+            page = None
+
+            for row in rows:
+                yield row
+
+            if not more_results:
+                break
+            page = ETContinue(self.event.auth_stub, request_id)
+
+        # run complete, move the watermark up to the newest event seen
+        self.store.save(self.name, newest(event_date, pending_date))
+
+    def retrieve(self, event_date):
+        if event_date is None:
+            return self.event.get()
+
+        date_filter = {'Property': 'EventDate', 'SimpleOperator': 'greaterThan', 'DateValue': event_date - self.overlap}
+        if self.event.search_filter is None:
+            return self.event.get(m_filter=date_filter)
+        if 'LogicalOperator' in self.event.search_filter:
+            raise Exception('Incremental sync of {0} only supports a simple search_filter'.format(self.name))
+        return self.event.get(m_filter={'LeftOperand': date_filter, 'LogicalOperator': 'AND',
+                                        'RightOperand': self.event.search_filter})
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+
+class ETFileTokenStore(object):
+    '''
+    Share OAuth tokens between the processes on one host through a JSON file.
+    Writes are atomic renames so reads need no lock, refreshing takes an exclusive
+    flock on a side file so only one process at a time goes to the auth endpoint.
+    '''
+
+    def __init__(self, path):
+        if fcntl is None:
+            raise Exception('ETFileTokenStore requires fcntl file locking which is not available on this platform')
+        self.path = path
+        self.lock_path = path + '.lock'
+
+    @staticmethod
+    def key(client_id, auth_url):
+        '''
+        entries are keyed by a hash of the client id and auth url so the id itself is not written to disk
+        '''
+        return hashlib.sha1('{0}|{1}'.format(client_id, auth_url).encode('utf-8')).hexdigest()
+
+    def read_all(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def load(self, key):
+        return self.read_all().get(key)
+
+    def save(self, key, entry):
+        '''
+        should be called while holding lock()
+        '''
+        entries = self.read_all()
+        entries[key] = entry
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_name = tempfile.mkstemp(dir=directory)
+        try:
+            os.chmod(tmp_name, 0o600)  # the file holds live tokens
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.rename(tmp_name, self.path)
+        except (IOError, OSError):
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+            raise
+
+    @contextmanager
+    def lock(self):
+        fd = os.open(self.lock_path, os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
@@ -0,0 +1,54 @@
+import logging
+import urllib2
+from cStringIO import StringIO
+
+from suds.transport import Transport, Reply, TransportError
+
+log = logging.getLogger('suds.transport.http')
+
+
+class ETHttpTransport(Transport):
+    '''
+    suds transport that sends SOAP calls over a pooled requests session, so connections (and
+    their TLS handshake) are reused between calls and gzip/deflate responses are decoded
+
+    session - requests.Session to send through, see build_http_session()
+    connect_timeout - seconds to wait for the connection to the SOAP endpoint
+    read_timeout - seconds to wait for the SOAP response
+    '''
+
+    def __init__(self, session, connect_timeout=30, read_timeout=600):
+        Transport.__init__(self)
+        self.session = session
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    def open(self, request):
+        '''
+        used by suds to read the WSDL and its imported schemas
+        '''
+        log.debug('opening (%s)', request.url)
+        if not request.url.startswith('http'):
+            return urllib2.urlopen(request.url)
+
+        r = self.session.get(request.url, timeout=(self.connect_timeout, self.read_timeout))
+        if r.status_code >= 300:
+            raise TransportError(r.reason, r.status_code, StringIO(r.content))
+        return StringIO(r.content)
+
+    def send(self, request):
+        log.debug('sending:\n%s', request)
+        r = self.session.post(request.url, data=request.message, headers=request.headers,
+                              timeout=(self.connect_timeout, self.read_timeout))
+
+        # suds treats 202/204 as an empty reply and parses the fault body out of the rest
+        if r.status_code >= 300 or r.status_code in (202, 204):
+            raise TransportError(r.reason, r.status_code, StringIO(r.content))
+
+        reply = Reply(r.status_code, dict(r.headers), r.content)
+        log.debug('received:\n%s', reply)
+        return reply
+
+    def __deepcopy__(self, memo={}):
+        # suds clones its options (transport included) for Client.clone(), the clone keeps the same pool
+        return self.__class__(self.session, self.connect_timeout, self.read_timeout)
@@ -0,0 +1,331 @@
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+import Queue
+
+from .concurrency import ETFuture, ETThreadPool
+from .config import exact_target_config
+from .rest import ETConstructor
+from .utility import get_prop
+
+
+def create_triggered_sends(auth_stub, ts_calls):
+    '''
+    Create ts_calls (TriggeredSend props) in one call, returns a (Result, None) or (None, exc_info) per
+    send. Each send is built and marshalled on its own first, so one with props the schema doesn't know
+    fails alone and the rest still go out. Once the Create has been sent it is never repeated: an error
+    from then on (connection, fault, a reply that can't be read) fails every send in it, as the server
+    may have accepted them.
+    '''
+    auth_stub.refresh_token()
+    soap_client = auth_stub.soap_client
+    method = soap_client.service.Create.method
+    constructor = ETConstructor()
+
+    outcomes = [None] * len(ts_calls)
+    objects = []
+    positions = []
+    for position, ts_call in enumerate(ts_calls):
+        try:
+            obj = constructor.parse_props_into_ws_object(auth_stub, 'TriggeredSend', ts_call)
+            # nested props are only checked against the schema when they are marshalled
+            method.binding.input.get_message(method, (None, [obj]), {})
+        except Exception:
+            outcomes[position] = (None, sys.exc_info())
+        else:
+            objects.append(obj)
+            positions.append(position)
+    if not objects:
+        return outcomes
+
+    try:
+        response = ETConstructor(soap_client.service.Create(None, objects))
+    except Exception:
+        exc_info = sys.exc_info()
+        for position in positions:
+            outcomes[position] = (None, exc_info)
+        return outcomes
+
+    results = {}
+    for i, result in enumerate(response.results):
+        ordinal = get_prop(result, 'OrdinalID')
+        results[i if ordinal is None else ordinal] = result
+
+    for ordinal, position in enumerate(positions):
+        if ordinal in results:
+            outcomes[position] = (results[ordinal], None)
+        else:
+            try:
+                raise Exception('Unable to send TriggeredSend code: {0} message: {1}'.format(response.code, response.message))
+            except Exception:
+                outcomes[position] = (None, sys.exc_info())
+    return outcomes
+
+
+class ETTriggeredSendDispatcher(object):
+    '''
+    Coalesces triggered sends made from many threads into shared Create calls. send() queues the send
+    and returns an ETFuture straight away. Queued sends go out together as soon as they add up to
+    max_subscribers subscribers, or max_latency seconds after the first of them was queued, and each
+    future gets the Result of its own send (StatusCode, StatusMessage, SubscriberFailures, ...).
+
+    Each send stays its own TriggeredSend object in the Create, so sends for different definitions and
+    with different Attributes share a call. Up to max_workers Create calls run at once. A send that
+    can't be written (see create_triggered_sends) fails only its own future.
+    '''
+
+    def __init__(self, auth_stub, max_subscribers=100, max_latency=0.2, max_workers=None):
+        self.auth_stub = auth_stub
+        self.max_subscribers = max_subscribers
+        self.max_latency = max_latency
+        self.queue = Queue.Queue()
+        self.pool = ETThreadPool(max_workers=max_workers or exact_target_config.max_concurrency,
+                                 name='FuelSDK-triggered-send')
+        self.thread = threading.Thread(target=self.run, name='FuelSDK-triggered-send-batcher')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def send(self, definition, subscribers, attributes=None):
+        '''
+        definition - TriggeredSendDefinition props, such as {'CustomerKey': 'welcome'}
+        subscribers - Subscriber props or a list of them
+        '''
+        if type(subscribers) is not list:
+            subscribers = [subscribers]
+        future = ETFuture()
+        ts_call = {'TriggeredSendDefinition': definition, 'Subscribers': subscribers, 'Attributes': attributes}
+        self.queue.put((ts_call, future))
+        return future
+
+    def close(self):
+        '''
+        send whatever is queued and wait for every call to finish
+        '''
+        self.queue.put(None)
+        self.thread.join()
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def run(self):
+        closing = False
+        while not closing:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            subscribers = len(item[0]['Subscribers'])
+            deadline = time.time() + self.max_latency
+            while subscribers < self.max_subscribers:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except Queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+                subscribers += len(item[0]['Subscribers'])
+            self.pool.submit(self.deliver, batch)
+
+    def deliver(self, batch):
+        try:
+            outcomes = create_triggered_sends(self.auth_stub, [ts_call for ts_call, _ in batch])
+        except BaseException:
+            exc_info = sys.exc_info()
+            for _, future in batch:
+                future.set_exception(exc_info)
+            return
+
+        for (_, future), (result, exc_info) in zip(batch, outcomes):
+            if exc_info is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc_info)
+
+
+class ETTriggeredSendOutbox(object):
+    '''
+    sqlite file of triggered sends waiting to be delivered by an ETOutboxDrainer. Set it as
+    ETTriggeredSend.outbox and send() only writes the send here, so callers never wait on the SOAP
+    endpoint. Every send has an idempotency key: adding the same key twice keeps one send, and the key
+    goes out as the TriggeredSend CorrelationID. A send is marked sent only after the server accepted
+    it, so a crash in between delivers it again (at least once).
+
+    Drainers claim the sends they deliver, so several of them (threads or processes) can share an
+    outbox without sending twice. A claim is a lease: sends whose drainer died are claimed again once
+    it runs out.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS outbox ('
+                            'id INTEGER PRIMARY KEY AUTOINCREMENT, idempotency_key TEXT UNIQUE, payload TEXT, '
+                            'status TEXT, attempts INTEGER, next_attempt REAL, last_error TEXT, created REAL)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt)')
+            columns = [row[1] for row in self.db.execute('PRAGMA table_info(outbox)')]
+            if 'lease' not in columns:
+                self.db.execute('ALTER TABLE outbox ADD COLUMN lease TEXT')
+            self.db.execute('CREATE INDEX IF NOT EXISTS outbox_lease ON outbox (lease)')
+
+    def add(self, definition, subscribers, attributes=None, idempotency_key=None):
+        '''
+        queue a send and return its idempotency key
+        '''
+        if idempotency_key is None:
+            idempotency_key = str(uuid.uuid4())
+        if type(subscribers) is not list:
+            subscribers = [subscribers]
+        payload = json.dumps({'TriggeredSendDefinition': definition, 'Subscribers': subscribers, 'Attributes': attributes},
+                             default=unicode)
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute('INSERT OR IGNORE INTO outbox (idempotency_key, payload, status, attempts, next_attempt, created) '
+                            'VALUES (?, ?, \'pending\', 0, ?, ?)', (idempotency_key, payload, now, now))
+        return idempotency_key
+
+    def claim(self, limit, lease_time):
+        '''
+        claim up to limit sends that are ready to be delivered for lease_time seconds, oldest first, and
+        return them as (idempotency key, TriggeredSend props, attempts). Sends in a lease that ran out
+        are claimed again.
+        '''
+        lease = str(uuid.uuid4())
+        now = time.time()
+        with self.lock:
+            with self.db:
+                # one statement, so no other connection can claim the same rows in between
+                self.db.execute('UPDATE outbox SET status = \'sending\', lease = ?, next_attempt = ? WHERE id IN ('
+                                'SELECT id FROM outbox WHERE status IN (\'pending\', \'sending\') AND next_attempt <= ? '
+                                'ORDER BY id LIMIT ?)', (lease, now + lease_time, now, limit))
+            rows = self.db.execute('SELECT idempotency_key, payload, attempts FROM outbox WHERE lease = ? ORDER BY id',
+                                   (lease,)).fetchall()
+        return [(key, json.loads(payload), attempts) for key, payload, attempts in rows]
+
+    def mark_sent(self, keys):
+        with self.lock, self.db:
+            self.db.executemany('UPDATE outbox SET status = \'sent\', attempts = attempts + 1, last_error = NULL, lease = NULL '
+                                'WHERE idempotency_key = ?', [(key,) for key in keys])
+
+    def mark_retry(self, key, error, next_attempt):
+        with self.lock, self.db:
+            self.db.execute('UPDATE outbox SET status = \'pending\', attempts = attempts + 1, last_error = ?, next_attempt = ?, '
+                            'lease = NULL WHERE idempotency_key = ?', (error, next_attempt, key))
+
+    def mark_failed(self, key, error):
+        with self.lock, self.db:
+            self.db.execute('UPDATE outbox SET status = \'failed\', attempts = attempts + 1, last_error = ?, lease = NULL '
+                            'WHERE idempotency_key = ?', (error, key))
+
+    def status(self, key):
+        '''
+        (pending, sending, sent or failed, attempts, last error) of a send, None for an unknown key
+        '''
+        with self.lock:
+            return self.db.execute('SELECT status, attempts, last_error FROM outbox WHERE idempotency_key = ?', (key,)).fetchone()
+
+    def purge(self, older_than):
+        '''
+        forget sent sends queued more than older_than seconds ago
+        '''
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM outbox WHERE status = \'sent\' AND created < ?', (time.time() - older_than,))
+
+    def close(self):
+        self.db.close()
+
+
+class ETOutboxDrainer(object):
+    '''
+    Background thread delivering an ETTriggeredSendOutbox in Create calls of up to batch_size sends.
+    A send that fails is retried after retry_delay seconds, doubling with each attempt up to
+    max_retry_delay, and given up on (status failed) after max_attempts. Each batch is claimed for
+    lease_time seconds, which should be longer than delivering it can take.
+    '''
+
+    def __init__(self, auth_stub, outbox, batch_size=100, interval=1, max_attempts=10, retry_delay=30,
+                 max_retry_delay=3600, lease_time=1800):
+        self.auth_stub = auth_stub
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.lease_time = lease_time
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name='FuelSDK-outbox-drainer')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, wait=True):
+        self.stopping.set()
+        if wait and self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        while not self.stopping.is_set():
+            try:
+                delivered = self.drain_once()
+            except Exception:
+                logging.exception('Unable to drain triggered send outbox {0}'.format(self.outbox.path))
+                delivered = 0
+            if not delivered:
+                self.stopping.wait(self.interval)
+
+    def drain_once(self):
+        '''
+        deliver one batch of due sends, returns how many were attempted
+        '''
+        due = self.outbox.claim(self.batch_size, self.lease_time)
+        if not due:
+            return 0
+
+        ts_calls = []
+        for key, ts_call, _ in due:
+            ts_call['CorrelationID'] = key
+            ts_calls.append(ts_call)
+
+        try:
+            outcomes = create_triggered_sends(self.auth_stub, ts_calls)
+        except Exception:
+            # such as a failed token refresh, retry the claimed sends rather than leave them to their lease
+            outcomes = [(None, sys.exc_info())] * len(ts_calls)
+
+        sent = []
+        for (key, _, attempts), (result, exc_info) in zip(due, outcomes):
+            if result is not None and get_prop(result, 'StatusCode') == 'OK':
+                sent.append(key)
+                continue
+            if result is not None:
+                send_error = '{0} {1}'.format(get_prop(result, 'ErrorCode'), get_prop(result, 'StatusMessage'))
+            else:
+                logging.error('Unable to deliver triggered send {0}'.format(key), exc_info=exc_info)
+                send_error = str(exc_info[1])
+            if attempts + 1 >= self.max_attempts:
+                self.outbox.mark_failed(key, send_error)
+            else:
+                delay = min(self.retry_delay * 2 ** attempts, self.max_retry_delay)
+                self.outbox.mark_retry(key, send_error, time.time() + delay)
+        self.outbox.mark_sent(sent)
+        return len(due)
@@ -1,5 +1,37 @@
 
+from datetime import datetime
+
+from suds.sudsobject import Object
+
+
 def prune_dict(dictionary):
     res = {}
     res.update((a, b) for a, b in dictionary.iteritems() if b is not None)
     return res
+
+
+def get_prop(obj, prop):
+    """
+    read a dotted property path such as Client.ID from a suds object or dict, None when missing
+    """
+    for name in prop.split('.'):
+        if obj is None:
+            return None
+        try:
+            obj = obj[name]
+        except (KeyError, AttributeError, TypeError):
+            obj = getattr(obj, name, None)
+    return obj
+
+
+def suds_to_dict(value):
+    """
+    convert a suds result into plain dicts and lists, dates become ISO strings
+    """
+    if isinstance(value, Object):
+        return dict((k, suds_to_dict(v)) for k, v in value)
+    if isinstance(value, list):
+        return [suds_to_dict(v) for v in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
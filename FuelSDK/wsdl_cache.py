@@ -0,0 +1,63 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from suds.cache import ObjectCache
+
+
+def wsdl_digest(wsdl_file_location):
+    '''
+    sha1 of the WSDL file contents, used to name the cache directory for that WSDL
+    '''
+    sha = hashlib.sha1()
+    with open(wsdl_file_location, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def purge_wsdl_cache(cache_dir, wsdl_file_location):
+    '''
+    drop the cached schema for the WSDL currently on disk, called before it is replaced by a newer copy
+    '''
+    if not cache_dir or not os.path.exists(wsdl_file_location):
+        return
+
+    location = os.path.join(cache_dir, wsdl_digest(wsdl_file_location))
+    if os.path.isdir(location):
+        logging.log(level=logging.INFO, msg='Purging WSDL cache {0}'.format(location))
+        shutil.rmtree(location, ignore_errors=True)
+
+
+class ETWsdlCache(ObjectCache):
+    '''
+    Pickled suds WSDL/schema cache keyed by the hash of the WSDL contents.
+    Entries never expire on their own, a different WSDL simply lands in a different directory.
+    '''
+
+    def __init__(self, cache_dir, wsdl_file_location):
+        self.digest = wsdl_digest(wsdl_file_location)
+        ObjectCache.__init__(self, location=os.path.join(cache_dir, self.digest), days=0)
+
+    def put(self, id, object):
+        # write to a temp file and rename it into place so a process starting up at the
+        # same time never unpickles a half written schema
+        bfr = pickle.dumps(object, self.protocol)
+        self.mktmp()
+        fd, tmp_name = tempfile.mkstemp(dir=self.location)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(bfr)
+            os.rename(tmp_name, os.path.join(self.location, '{0}-{1}.{2}'.format(self.fnprefix, id, self.fnsuffix())))
+        except (IOError, OSError):
+            logging.exception('Unable to write WSDL cache entry {0}'.format(id))
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+        return object
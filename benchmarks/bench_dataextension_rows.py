@@ -0,0 +1,91 @@
+'''
+Compare building DataExtensionObject Update requests through suds with the direct envelope writer
+(fast_data_extension_xml). Only the request body is built, nothing is sent.
+
+usage: python benchmarks/bench_dataextension_rows.py [path/to/ExactTargetWSDL.xml] [rows per batch] [columns] [batches]
+
+Importing FuelSDK reads its config, so FUELSDK_CLIENT_ID and FUELSDK_CLIENT_SECRET must be set (any value).
+'''
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from FuelSDK.bulk import UPSERT_OPTIONS
+from FuelSDK.client import ETClient
+from FuelSDK.envelope import ETDataExtensionEnvelope
+from FuelSDK.objects import ETDataExtensionRowEncoder
+from FuelSDK.rest import ETConstructor
+from FuelSDK.session import build_http_session
+
+
+def offline_client(wsdl_file_location, cache_dir):
+    '''
+    ETClient with its suds client built from the WSDL file, without requesting a token
+    '''
+    client = ETClient.__new__(ETClient)
+    client.http_session = build_http_session()
+    client.endpoint = 'https://webservice.exacttarget.com/Service.asmx'
+    client.internal_auth_token = 'benchmark-token'
+    client.wsdl_file_location = os.path.abspath(wsdl_file_location)
+    client.wsdl_file_url = 'file://' + client.wsdl_file_location
+    client.wsdl_cache_dir = cache_dir
+    client.build_soap_client()
+    return client
+
+
+def suds_update(client, rows, encoder):
+    props = [encoder.encode(row) for row in rows]
+    constructor = ETConstructor()
+    options = constructor.parse_props_dict_into_ws_object('UpdateOptions', client.soap_factory.create('UpdateOptions'), UPSERT_OPTIONS)
+    objects = constructor.parse_props_into_ws_object(client, 'DataExtensionObject', props)
+    method = client.soap_client.service.Update.method
+    return method.binding.input.get_message(method, (options, objects), {}).plain().encode('utf-8')
+
+
+def envelope_update(client, rows, encoder):
+    props = [encoder.encode(row) for row in rows]
+    return client.data_extension_envelope.build('Update', props, UPSERT_OPTIONS)
+
+
+def rows_per_second(build, client, batch, encoder, batches):
+    start = time.time()
+    for _ in range(batches):
+        build(client, batch, encoder)
+    return len(batch) * batches / (time.time() - start)
+
+
+def main():
+    if len(sys.argv) > 1:
+        wsdl_file_location = os.path.abspath(sys.argv[1])
+    else:
+        wsdl_file_location = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'FuelSDK', 'ExactTargetWSDL.xml')
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 2500
+    column_count = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    batches = int(sys.argv[4]) if len(sys.argv) > 4 else 3
+
+    columns = ['Field{0}'.format(i) for i in range(column_count)]
+    batch = [tuple(u'row {0} value {1} & more'.format(row, i) for i in range(column_count)) for row in range(batch_size)]
+    encoder = ETDataExtensionRowEncoder('benchmark-de', columns)
+
+    cache_dir = tempfile.mkdtemp(prefix='FuelSDK-bench-')
+    try:
+        client = offline_client(wsdl_file_location, cache_dir)
+        client.data_extension_envelope = ETDataExtensionEnvelope(client)
+        # warm up the factory prototypes so neither side pays for them
+        suds_update(client, batch[:1], encoder)
+
+        before = rows_per_second(suds_update, client, batch, encoder, batches)
+        after = rows_per_second(envelope_update, client, batch, encoder, batches)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print 'Update of {0} batches of {1} rows x {2} columns'.format(batches, batch_size, column_count)
+    print 'suds marshalling: {0:,.0f} rows/s'.format(before)
+    print 'direct envelope: {0:,.0f} rows/s ({1:.1f}x)'.format(after, after / before)
+
+
+if __name__ == '__main__':
+    main()
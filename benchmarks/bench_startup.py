@@ -0,0 +1,63 @@
+'''
+Compare suds client construction with the suds default cache, as ETClient used it before (cachingpolicy=1
+and ObjectCache(days=1), keyed by the WSDL URL), and with the FuelSDK WSDL schema cache (keyed by the hash
+of the WSDL contents, no expiry). Both pickle the parsed schema, so a warm start costs about the same; what
+ETWsdlCache changes is when the cache is thrown away: on a new WSDL instead of once a day, so a new WSDL is
+never served from a stale entry and an unchanged one is not parsed again every day.
+
+usage: python benchmarks/bench_startup.py [path/to/ExactTargetWSDL.xml] [runs]
+
+Importing FuelSDK reads its config, so FUELSDK_CLIENT_ID and FUELSDK_CLIENT_SECRET must be set (any value).
+'''
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import suds.client
+from suds.cache import ObjectCache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from FuelSDK.wsdl_cache import ETWsdlCache
+
+
+def build(wsdl_file_location, cache):
+    start = time.time()
+    suds.client.Client('file://' + wsdl_file_location, faults=False, cachingpolicy=1, cache=cache)
+    return time.time() - start
+
+
+def starts(wsdl_file_location, make_cache, runs):
+    '''
+    (first build, which parses and writes the cache, best of runs builds from the cache)
+    '''
+    first = build(wsdl_file_location, make_cache())
+    return first, min(build(wsdl_file_location, make_cache()) for _ in range(runs))
+
+
+def main():
+    if len(sys.argv) > 1:
+        wsdl_file_location = os.path.abspath(sys.argv[1])
+    else:
+        wsdl_file_location = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'FuelSDK', 'ExactTargetWSDL.xml')
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    cache_dir = tempfile.mkdtemp(prefix='FuelSDK-bench-')
+    try:
+        # the suds default, ObjectCache(days=1), in a directory of its own so earlier runs don't count
+        suds_dir = os.path.join(cache_dir, 'suds')
+        default = starts(wsdl_file_location, lambda: ObjectCache(location=suds_dir, days=1), runs)
+        hashed = starts(wsdl_file_location, lambda: ETWsdlCache(os.path.join(cache_dir, 'fuelsdk'), wsdl_file_location), runs)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print 'WSDL: {0} ({1} bytes)'.format(wsdl_file_location, os.path.getsize(wsdl_file_location))
+    print 'suds default cache: first build {0:.3f}s, cached best of {1}: {2:.3f}s'.format(default[0], runs, default[1])
+    print 'ETWsdlCache: first build {0:.3f}s, cached best of {1}: {2:.3f}s'.format(hashed[0], runs, hashed[1])
+    print 'The suds default cache parses the WSDL again every day and keeps serving the old schema for up to'
+    print 'a day after the WSDL changes; ETWsdlCache parses once per WSDL version.'
+
+
+if __name__ == '__main__':
+    main()
@@ -16,7 +16,7 @@ setup(
     license='MIT',
     install_requires=[
         'pyjwt==0.1.9',
-        'requests==2.2.1',
+        'requests==2.4.3',
         'suds==0.4',
     ],
     classifiers=[
@@ -0,0 +1,5 @@
+import os
+
+# importing FuelSDK reads its config, which requires these
+os.environ.setdefault('FUELSDK_CLIENT_ID', 'stand-in')
+os.environ.setdefault('FUELSDK_CLIENT_SECRET', 'stand-in')
@@ -0,0 +1,225 @@
+'''
+Local stand-in for the ExactTarget auth and SOAP endpoints, so a client can be tested without network
+access or an account. Retrieve answers with pages of SentEvent rows (or the AsyncRequestResult and
+ResultItems of an asynchronous request, or the fields of a DataExtension), Create/Update/Delete with a
+result per object.
+'''
+import BaseHTTPServer
+import SocketServer
+import itertools
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from FuelSDK.client import ETClient
+
+ENVELOPE = ('<?xml version="1.0" encoding="utf-8"?>'
+            '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/" '
+            'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"><soap:Body>{0}</soap:Body></soap:Envelope>')
+PARTNER_NS = 'http://exacttarget.com/wsdl/partnerAPI'
+WSDL = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'FuelSDK', 'ExactTargetWSDL.xml')
+
+
+def sent_event(page, i):
+    return ('<Results xsi:type="SentEvent"><Client><ID>1234</ID></Client><PartnerKey xsi:nil="true" />'
+            '<ObjectID xsi:nil="true" /><SendID>{0}</SendID><SubscriberKey>sub{1}-{2}@example.com</SubscriberKey>'
+            '<EventDate>2015-01-{3:02d}T10:{4:02d}:00</EventDate><EventType>Sent</EventType></Results>').format(
+        1000 + page, page, i, page + 1, i % 60)
+
+
+class StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        stand_in = self.server.stand_in
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if 'SOAPAction' not in self.headers:
+            stand_in.record('Token')
+            return self.reply(json.dumps({'accessToken': 'stand-in', 'legacyToken': 'stand-in', 'expiresIn': 3600}),
+                              'application/json')
+
+        action = self.headers['SOAPAction'].strip('"')
+        stand_in.begin(action, body)
+        try:
+            time.sleep(stand_in.delay)
+            self.reply(ENVELOPE.format(getattr(self, 'soap_' + action)(body)), 'text/xml; charset=utf-8')
+        finally:
+            stand_in.end()
+
+    def reply(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def soap_Retrieve(self, body):
+        stand_in = self.server.stand_in
+        object_type = re.search(r'<(?:\w+:)?ObjectType>([^<]+)<', body)
+        if object_type is not None and object_type.group(1) in ('AsyncRequestResult', 'ResultItem'):
+            return self.retrieve_async(object_type.group(1), body)
+        if object_type is not None and object_type.group(1) == 'DataExtensionField':
+            rows = ''.join('<Results xsi:type="DataExtensionField"><Name>{0}</Name></Results>'.format(name)
+                           for name in stand_in.fields)
+            return '<RetrieveResponseMsg xmlns="{0}"><OverallStatus>OK</OverallStatus><RequestID>r{1}</RequestID>{2}</RetrieveResponseMsg>'.format(
+                PARTNER_NS, next(stand_in.ids), rows)
+        request_id = re.search(r'<(?:\w+:)?ContinueRequest>([^<]+)<', body)
+        with stand_in.lock:
+            if request_id is None:
+                request_id = 'retrieve-{0}'.format(next(stand_in.ids))
+                page = 0
+            else:
+                request_id = request_id.group(1)
+                page = stand_in.cursors[request_id] + 1
+            stand_in.cursors[request_id] = page
+        status = 'MoreDataAvailable' if page < stand_in.pages - 1 else 'OK'
+        rows = ''.join(sent_event(page, i) for i in range(stand_in.rows))
+        return '<RetrieveResponseMsg xmlns="{0}"><OverallStatus>{1}</OverallStatus><RequestID>{2}</RequestID>{3}</RetrieveResponseMsg>'.format(
+            PARTNER_NS, status, request_id, rows)
+
+    def retrieve_async(self, object_type, body):
+        '''
+        the requested Properties of the request's AsyncRequestResult (the next of async_statuses on each call)
+        or of a ResultItem per object of the request
+        '''
+        stand_in = self.server.stand_in
+        props = re.findall(r'<(?:\w+:)?Properties>([^<]+)<', body)
+        request_id = re.search(r'<(?:\w+:)?Value>([^<]+)<', body).group(1)
+        if object_type == 'AsyncRequestResult':
+            with stand_in.lock:
+                status = stand_in.async_statuses.pop(0) if len(stand_in.async_statuses) > 1 else stand_in.async_statuses[0]
+            values = [{'RequestID': request_id, 'Status': status, 'CallStatus': 'OK', 'CallMessage': ''}]
+        else:
+            values = [{'RequestID': request_id, 'StatusCode': 'OK', 'StatusMessage': 'Created', 'OrdinalID': i,
+                       'RequestType': 'Asynchronous', 'RequestObjectType': 'ContentArea'} for i in range(stand_in.rows)]
+        rows = ''.join('<Results xsi:type="{0}">{1}</Results>'.format(
+            object_type, ''.join('<{0}>{1}</{0}>'.format(prop, row[prop]) for prop in props if prop in row)) for row in values)
+        return '<RetrieveResponseMsg xmlns="{0}"><OverallStatus>OK</OverallStatus><RequestID>r{1}</RequestID>{2}</RetrieveResponseMsg>'.format(
+            PARTNER_NS, next(stand_in.ids), rows)
+
+    def results(self, method, body):
+        stand_in = self.server.stand_in
+        results = []
+        for i, obj in enumerate(re.findall(r'<(?:\w+:)?Objects[ >].*?</(?:\w+:)?Objects>', body, re.S)):
+            if any(marker in obj for marker in stand_in.failing):
+                status = '<StatusCode>Error</StatusCode><StatusMessage>Failed</StatusMessage><ErrorCode>12014</ErrorCode>'
+            else:
+                status = '<StatusCode>OK</StatusCode><StatusMessage>Done</StatusMessage>'
+            results.append('<Results>{0}<OrdinalID>{1}</OrdinalID>{2}</Results>'.format(status, i, stand_in.result_extra))
+        results = ''.join(results)
+        return '<{0}Response xmlns="{1}">{2}<RequestID>{3}</RequestID><OverallStatus>OK</OverallStatus></{0}Response>'.format(
+            method, PARTNER_NS, results, next(self.server.stand_in.ids))
+
+    def soap_Create(self, body):
+        return self.results('Create', body)
+
+    def soap_Update(self, body):
+        return self.results('Update', body)
+
+    def soap_Delete(self, body):
+        return self.results('Delete', body)
+
+
+class StandInHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class StandInServer(object):
+    '''
+    delay - seconds each SOAP call takes
+    rows, pages - size of every Retrieve
+    wsdl_cache_dir - where clients cache the parsed WSDL, share one between servers to parse it only once
+
+    calls lists the SOAP actions received and requests the (action, body) of each SOAP call,
+    max_in_flight is the most SOAP calls that were being answered at the same time. A Create, Update or
+    Delete object whose XML contains one of the strings in failing gets an Error result, result_extra
+    is added to every result. async_statuses are the Status of asynchronous requests on each poll, the
+    last one stays. fields are the fields of every DataExtension.
+    '''
+
+    def __init__(self, delay=0, rows=5, pages=1, wsdl_cache_dir=None):
+        self.delay = delay
+        self.rows = rows
+        self.pages = pages
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.cursors = {}
+        self.calls = []
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.failing = set()
+        self.result_extra = ''
+        self.async_statuses = ['Complete']
+        self.fields = ['Email', 'Name']
+
+        self.dir = tempfile.mkdtemp(prefix='FuelSDK-stand-in-')
+        # the bundled WSDL imports the fault schema from the live endpoint
+        with open(WSDL) as f:
+            wsdl = re.sub(r'<import id="APIFault"[^>]*/>', '', f.read())
+        self.wsdl = os.path.join(self.dir, 'ExactTargetWSDL.xml')
+        with open(self.wsdl, 'w') as f:
+            f.write(wsdl)
+        self.wsdl_cache_dir = wsdl_cache_dir or os.path.join(self.dir, 'cache')
+
+        self.http_server = StandInHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.http_server.stand_in = self
+        self.url = 'http://127.0.0.1:{0}'.format(self.http_server.server_address[1])
+        self.thread = threading.Thread(target=self.http_server.serve_forever, name='FuelSDK-stand-in')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def record(self, action):
+        with self.lock:
+            self.calls.append(action)
+
+    def begin(self, action, body):
+        with self.lock:
+            self.calls.append(action)
+            self.requests.append((action, body))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def end(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def reset(self):
+        with self.lock:
+            self.calls = []
+            self.requests = []
+            self.max_in_flight = 0
+            self.failing = set()
+            self.result_extra = ''
+
+    def objects(self, action):
+        '''
+        number of objects sent in each action call
+        '''
+        return [len(re.findall(r'<(?:\w+:)?Objects[ >]', body)) for name, body in self.requests if name == action]
+
+    def client(self, client_class=ETClient, params=None):
+        '''
+        a client_class instance that authenticates against and sends its SOAP calls to this server
+        '''
+        client_params = {'clientid': 'stand-in', 'clientsecret': 'stand-in',
+                         'authenticationurl': self.url + '/v1/requestToken',
+                         'wsdl_file_local_loc': self.wsdl, 'wsdl_cache_dir': self.wsdl_cache_dir}
+        client_params.update(params or {})
+        client = client_class.__new__(client_class)
+        # skip the endpoint lookup on the live platform
+        client.endpoint = self.url + '/Service.asmx'
+        client.__init__(params=client_params)
+        return client
+
+    def close(self):
+        self.http_server.shutdown()
+        self.http_server.server_close()
+        shutil.rmtree(self.dir, ignore_errors=True)
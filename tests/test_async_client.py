@@ -0,0 +1,92 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from FuelSDK import AsyncETClient, ETContentArea, ETSentEvent
+
+from .stand_in_server import StandInServer
+
+
+class AsyncETClientTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.wsdl_cache_dir = tempfile.mkdtemp(prefix='FuelSDK-test-wsdl-')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.wsdl_cache_dir, ignore_errors=True)
+
+    def start(self, delay=0, rows=5, **params):
+        self.server = StandInServer(delay=delay, rows=rows, wsdl_cache_dir=self.wsdl_cache_dir)
+        self.addCleanup(self.server.close)
+        self.client = self.server.client(AsyncETClient, params)
+        self.addCleanup(self.client.http_session.close)
+        self.addCleanup(self.client.shutdown)
+
+    def sent_events(self, count):
+        events = []
+        for _ in range(count):
+            event = ETSentEvent()
+            event.props = ['SendID', 'SubscriberKey', 'EventDate']
+            events.append(event)
+        return events
+
+    def test_get_returns_the_response(self):
+        self.start()
+        response = self.client.get(self.sent_events(1)[0]).result()
+        self.assertTrue(response.status)
+        self.assertEqual(len(response.results), self.server.rows)
+        self.assertEqual(response.results[0].SendID, 1000)
+
+    def test_post_returns_the_response(self):
+        self.start()
+        content_area = ETContentArea()
+        content_area.props = {'CustomerKey': 'stand-in', 'Name': 'stand-in', 'Content': '<b>stand-in</b>'}
+        response = self.client.post(content_area).result()
+        self.assertTrue(response.status)
+        self.assertEqual(response.results[0].StatusCode, 'OK')
+
+    def test_calls_run_concurrently(self):
+        self.start(delay=0.5, max_concurrency=4)
+        started = time.time()
+        futures = [self.client.get(event) for event in self.sent_events(4)]
+        for future in futures:
+            self.assertTrue(future.result().status)
+        self.assertLess(time.time() - started, 4 * 0.5)
+        self.assertGreater(self.server.max_in_flight, 1)
+
+    def test_max_concurrency_caps_calls_in_flight(self):
+        self.start(delay=0.1, max_concurrency=2)
+        futures = [self.client.get(event) for event in self.sent_events(6)]
+        for future in futures:
+            future.result()
+        self.assertEqual(self.server.calls.count('Retrieve'), 6)
+        self.assertLessEqual(self.server.max_in_flight, 2)
+
+    def test_concurrent_calls_get_their_own_replies(self):
+        self.start(rows=20, max_concurrency=32)
+        futures = [self.client.get(event) for event in self.sent_events(150)]
+        request_ids = [future.result().request_id for future in futures]
+        self.assertEqual(len(set(request_ids)), 150)
+
+    def test_submit_blocks_once_max_pending_calls_wait(self):
+        self.start(max_concurrency=1, max_pending=1)
+        release = threading.Event()
+        self.client.submit(release.wait)  # keeps the only worker busy
+        self.client.submit(lambda: None)  # waits for it
+
+        third = threading.Thread(target=self.client.submit, args=(lambda: None,))
+        third.start()
+        third.join(0.3)
+        self.assertTrue(third.is_alive())
+
+        release.set()
+        third.join(5)
+        self.assertFalse(third.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
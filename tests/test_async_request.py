@@ -0,0 +1,55 @@
+import unittest
+
+from FuelSDK import ETContentArea
+
+from .stand_in_server import StandInServer
+
+
+class ETAsyncRequestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer(rows=3)
+        self.addCleanup(self.server.close)
+        self.client = self.server.client()
+        self.addCleanup(self.client.http_session.close)
+
+    def post_async(self):
+        content_area = ETContentArea()
+        content_area.auth_stub = self.client
+        content_area.props = {'CustomerKey': 'stand-in', 'Name': 'stand-in', 'Content': '<b>stand-in</b>'}
+        return content_area.post_async()
+
+    def test_post_is_sent_asynchronously(self):
+        request = self.post_async()
+        self.assertIsNotNone(request.request_id)
+        create = [body for action, body in self.server.requests if action == 'Create'][0]
+        self.assertIn('>Asynchronous<', create)
+
+    def test_status(self):
+        self.server.async_statuses = ['Queued', 'InProcess', 'Complete']
+        request = self.post_async()
+        self.assertEqual(request.status(), 'Queued')
+        self.assertFalse(request.done())
+        self.assertTrue(request.done())
+
+    def test_wait_polls_until_the_request_is_processed(self):
+        self.server.async_statuses = ['Queued', 'InProcess', 'InProcess', 'Error']
+        request = self.post_async()
+        self.assertEqual(request.wait(timeout=5, interval=0.01), 'Error')
+        self.assertEqual(self.server.calls.count('Retrieve'), 4)
+
+    def test_wait_times_out(self):
+        self.server.async_statuses = ['InProcess']
+        request = self.post_async()
+        self.assertRaises(Exception, request.wait, timeout=0.05, interval=0.02)
+
+    def test_results(self):
+        request = self.post_async()
+        items = list(request.results())
+        self.assertEqual([item.OrdinalID for item in items], [0, 1, 2])
+        self.assertEqual(set(item.RequestID for item in items), set([request.request_id]))
+        self.assertEqual(items[0].StatusCode, 'OK')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from FuelSDK.bulk import ETDataExtensionRowWriter, ETRowHashIndex
+
+from .stand_in_server import StandInServer
+
+
+class BulkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        self.addCleanup(self.server.close)
+        self.client = self.server.client()
+        self.addCleanup(self.client.http_session.close)
+        self.writer = ETDataExtensionRowWriter(self.client, customer_key='de', batch_size=2)
+
+    def sent_emails(self):
+        '''
+        the emails in each Update, batches in order of their first email as they are sent concurrently
+        '''
+        return sorted(re.findall(r'<(?:\w+:)?Value>([^<]*@[^<]*)<', body)
+                      for action, body in self.server.requests if action == 'Update')
+
+
+class IngestTest(BulkTest):
+
+    def test_csv(self):
+        lines = ['\xef\xbb\xbfEMAIL,Name,Internal ID', 'a@example.com,J\xc3\xbcrgen,1', '', 'short@example.com,S',
+                 'b@example.com,B,2', 'c@example.com,C,3,extra']
+        outcomes = list(self.writer.ingest(lines, column_map={'Internal ID': None}))
+        self.assertEqual([(i, outcome['StatusCode']) for i, outcome in outcomes],
+                         [(0, 'OK'), (1, 'Error'), (2, 'OK'), (3, 'Error')])
+        self.assertIn('2 fields', outcomes[1][1]['StatusMessage'])
+        self.assertEqual(self.sent_emails(), [['a@example.com', 'b@example.com']])
+        self.assertIn(u'J\xfcrgen'.encode('utf-8'), self.server.requests[-1][1])
+
+    def test_ndjson(self):
+        lines = ['\xef\xbb\xbf{"Email": "a@example.com"}', '{"Email": "bogus@example.com", "Bogus": 1}', '{bad',
+                 '[1]', '', '{"Email": "b@example.com", "Name": "B"}']
+        outcomes = list(self.writer.ingest(lines, format='ndjson'))
+        self.assertEqual([(i, outcome['StatusCode']) for i, outcome in outcomes],
+                         [(0, 'OK'), (1, 'Error'), (2, 'Error'), (3, 'Error'), (4, 'OK')])
+        self.assertIn('Bogus', outcomes[1][1]['StatusMessage'])
+        self.assertEqual(self.sent_emails(), [['a@example.com', 'b@example.com']])
+
+
+class DeltaUpsertTest(BulkTest):
+
+    def setUp(self):
+        super(DeltaUpsertTest, self).setUp()
+        self.dir = tempfile.mkdtemp(prefix='FuelSDK-test-delta-')
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.index = ETRowHashIndex(os.path.join(self.dir, 'index.db'))
+        self.addCleanup(self.index.close)
+        self.rows = [{'Email': '{0}@example.com'.format(name), 'Name': name} for name in ('a', 'b', 'c')]
+
+    def delta_upsert(self, rows, failing=()):
+        self.server.reset()
+        self.server.failing.update(failing)
+        return list(self.writer.iter_delta_upsert(rows, self.index, ['Email']))
+
+    def test_second_run_sends_only_the_changed_rows(self):
+        outcomes = self.delta_upsert(self.rows)
+        self.assertEqual([i for i, _ in outcomes], [0, 1, 2])
+        self.assertEqual(self.sent_emails(), [['a@example.com', 'b@example.com'], ['c@example.com']])
+
+        self.rows[1]['Name'] = 'B'
+        outcomes = self.delta_upsert(self.rows)
+        self.assertEqual([(i, outcome['StatusCode']) for i, outcome in outcomes], [(1, 'OK')])
+        self.assertEqual(self.sent_emails(), [['b@example.com']])
+
+        self.assertEqual(self.delta_upsert(self.rows), [])
+        self.assertEqual(self.server.calls, [])
+
+    def test_failed_row_is_sent_again(self):
+        outcomes = self.delta_upsert(self.rows, failing=['b@example.com'])
+        self.assertEqual([outcome['StatusCode'] for _, outcome in outcomes], ['OK', 'Error', 'OK'])
+
+        self.delta_upsert(self.rows)
+        self.assertEqual(self.sent_emails(), [['b@example.com']])
+
+    def test_rows_missing_from_the_last_run_are_deleted(self):
+        self.delta_upsert(self.rows)
+        self.delta_upsert(self.rows[:1] + self.rows[2:])
+        self.assertEqual(self.server.calls, [])
+
+        self.server.reset()
+        deleted = list(self.writer.iter_delete_missing(self.index, ['Email']))
+        self.assertEqual([(key, outcome['StatusCode']) for key, outcome in deleted], [((u'b@example.com',), 'OK')])
+        self.assertEqual(self.server.objects('Delete'), [1])
+        self.assertEqual(list(self.writer.iter_delete_missing(self.index, ['Email'])), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
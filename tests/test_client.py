@@ -0,0 +1,43 @@
+import threading
+import time
+import unittest
+
+from .stand_in_server import StandInServer
+
+
+class ETClientTokenTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StandInServer()
+        self.addCleanup(self.server.close)
+        self.client = self.server.client()
+        self.addCleanup(self.client.http_session.close)
+
+    def token_requests(self):
+        return self.server.calls.count('Token')
+
+    def test_expired_token_is_refreshed_once_for_many_threads(self):
+        before = self.token_requests()
+        self.client.auth_token_expiration = time.time()
+        threads = [threading.Thread(target=self.client.refresh_token) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.token_requests() - before, 1)
+        self.assertFalse(self.client.token_has_expired(self.client.auth_token_expiration))
+
+    def test_valid_token_is_kept(self):
+        before = self.token_requests()
+        self.client.refresh_token()
+        self.assertEqual(self.token_requests(), before)
+
+    def test_force_refresh_always_refreshes(self):
+        before = self.token_requests()
+        self.client.refresh_token(force_refresh=True)
+        self.client.refresh_token(force_refresh=True)
+        self.assertEqual(self.token_requests() - before, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from FuelSDK.triggered_send import ETOutboxDrainer, ETTriggeredSendDispatcher, ETTriggeredSendOutbox
+
+from .stand_in_server import StandInServer
+
+server = None
+client = None
+
+
+def setUpModule():
+    # building the first TriggeredSend takes a while, so every test shares one client
+    global server, client
+    server = StandInServer()
+    client = server.client()
+
+
+def tearDownModule():
+    client.http_session.close()
+    server.close()
+
+
+class TriggeredSendTest(unittest.TestCase):
+
+    def setUp(self):
+        server.reset()
+
+
+class ETTriggeredSendDispatcherTest(TriggeredSendTest):
+
+    def send(self, sends):
+        dispatcher = ETTriggeredSendDispatcher(client, max_latency=0.5)
+        futures = [dispatcher.send(definition, subscriber) for definition, subscriber in sends]
+        dispatcher.close()
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result().StatusCode)
+            except Exception as e:
+                outcomes.append(str(e))
+        return outcomes
+
+    def welcome(self, i):
+        return {'CustomerKey': 'welcome'}, {'EmailAddress': 'sub{0}@example.com'.format(i), 'SubscriberKey': 'sub{0}'.format(i)}
+
+    def test_sends_share_one_create(self):
+        outcomes = self.send([self.welcome(i) for i in range(5)])
+        self.assertEqual(outcomes, ['OK'] * 5)
+        self.assertEqual(server.objects('Create'), [5])
+
+    def test_send_with_unknown_props_fails_alone(self):
+        sends = [self.welcome(i) for i in range(4)]
+        sends.insert(1, ({'CustomerKey': 'welcome'}, {'EmailAddress': 'bad@example.com', 'Bogus': 1}))
+        sends.append(({'CustomerKey': 'welcome', 'Nope': 1}, {'EmailAddress': 'worse@example.com'}))
+        outcomes = self.send(sends)
+        self.assertEqual([outcomes[i] for i in (0, 2, 3, 4)], ['OK'] * 4)
+        self.assertIn('Bogus', outcomes[1])
+        self.assertIn('Nope', outcomes[5])
+        self.assertEqual(server.objects('Create'), [4])
+
+    def test_create_is_not_repeated_when_the_reply_cant_be_read(self):
+        server.result_extra = '<Unknown>1</Unknown>'
+        # suds logs the whole schema when it meets the unknown element
+        logger = logging.getLogger('suds.umx.typed')
+        self.addCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.CRITICAL)
+        outcomes = self.send([self.welcome(i) for i in range(8)])
+        self.assertTrue(all(outcome != 'OK' for outcome in outcomes))
+        self.assertEqual(server.objects('Create'), [8])
+
+
+class ETTriggeredSendOutboxTest(TriggeredSendTest):
+
+    def setUp(self):
+        super(ETTriggeredSendOutboxTest, self).setUp()
+        self.dir = tempfile.mkdtemp(prefix='FuelSDK-test-outbox-')
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.outbox = self.open_outbox()
+
+    def open_outbox(self):
+        outbox = ETTriggeredSendOutbox(os.path.join(self.dir, 'outbox.db'))
+        self.addCleanup(outbox.close)
+        return outbox
+
+    def add(self, key, email):
+        self.outbox.add({'CustomerKey': 'welcome'}, {'EmailAddress': email}, idempotency_key=key)
+
+    def test_claimed_sends_are_not_claimed_again(self):
+        self.add('a', 'a@example.com')
+        self.add('b', 'b@example.com')
+        other = self.open_outbox()
+        self.assertEqual([key for key, _, _ in self.outbox.claim(1, 60)], ['a'])
+        self.assertEqual([key for key, _, _ in other.claim(10, 60)], ['b'])
+        self.assertEqual(self.outbox.claim(10, 60), [])
+        self.assertEqual(self.outbox.status('a')[0], 'sending')
+
+    def test_expired_lease_is_claimed_again(self):
+        self.add('a', 'a@example.com')
+        self.assertEqual(len(self.outbox.claim(10, 0.2)), 1)
+        self.assertEqual(self.outbox.claim(10, 0.2), [])
+        time.sleep(0.3)
+        self.assertEqual([key for key, _, _ in self.open_outbox().claim(10, 60)], ['a'])
+
+    def test_sent_sends_are_marked_sent(self):
+        self.add('a', 'a@example.com')
+        self.add('b', 'b@example.com')
+        drainer = ETOutboxDrainer(client, self.outbox)
+        self.assertEqual(drainer.drain_once(), 2)
+        self.assertEqual(self.outbox.status('a'), ('sent', 1, None))
+        self.assertEqual(self.outbox.status('b'), ('sent', 1, None))
+        self.assertEqual(drainer.drain_once(), 0)
+        self.assertEqual(server.objects('Create'), [2])
+
+    def test_failed_send_is_retried_after_the_delay(self):
+        self.add('a', 'a@example.com')
+        self.add('b', 'retry@example.com')
+        server.failing.add('retry@')
+        drainer = ETOutboxDrainer(client, self.outbox, retry_delay=0.3)
+        self.assertEqual(drainer.drain_once(), 2)
+        self.assertEqual(self.outbox.status('a')[0], 'sent')
+        status, attempts, error = self.outbox.status('b')
+        self.assertEqual((status, attempts), ('pending', 1))
+        self.assertIn('12014', error)
+
+        server.failing.clear()
+        self.assertEqual(drainer.drain_once(), 0)
+        time.sleep(0.4)
+        self.assertEqual(drainer.drain_once(), 1)
+        self.assertEqual(self.outbox.status('b'), ('sent', 2, None))
+        self.assertEqual(server.objects('Create'), [2, 1])
+
+    def test_sends_are_retried_when_the_token_refresh_fails(self):
+        self.add('a', 'a@example.com')
+        drainer = ETOutboxDrainer(client, self.outbox, retry_delay=0)
+
+        def refresh_token():
+            raise Exception('Unable to refresh the token')
+        client.refresh_token = refresh_token
+        self.addCleanup(vars(client).pop, 'refresh_token', None)
+        # the drainer logs each failed send
+        logging.disable(logging.ERROR)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+        self.assertEqual(drainer.drain_once(), 1)
+        self.assertEqual(self.outbox.status('a'), ('pending', 1, 'Unable to refresh the token'))
+        del client.refresh_token
+        self.assertEqual(drainer.drain_once(), 1)
+        self.assertEqual(self.outbox.status('a'), ('sent', 2, None))
+
+    def test_send_fails_after_max_attempts(self):
+        self.add('a', 'retry@example.com')
+        server.failing.add('retry@')
+        drainer = ETOutboxDrainer(client, self.outbox, max_attempts=2, retry_delay=0)
+        self.assertEqual(drainer.drain_once(), 1)
+        self.assertEqual(self.outbox.status('a')[0], 'pending')
+        self.assertEqual(drainer.drain_once(), 1)
+        self.assertEqual(self.outbox.status('a')[:2], ('failed', 2))
+        self.assertEqual(drainer.drain_once(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()